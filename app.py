@@ -1,11 +1,38 @@
 # app.py - 終極版：100% 保留你的賽博畫面 + 完整智慧功能
-from flask import Flask, render_template
-from flask_socketio import SocketIO
-import math, time, threading, random
+import os
+
+# 非同步模式：threading (預設，每個連線一條 OS 執行緒) / eventlet / gevent (協程，可撐數千個連線)
+# eventlet/gevent 必須在其他 import 之前 monkey patch
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "threading")
+if ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, render_template, request, abort, Response, jsonify
+from flask_socketio import SocketIO, emit, join_room, leave_room
+import time, threading, json, hashlib, collections, atexit
+import numpy as np
+from fleet import STATES, ACTIONS, TRACK_M
+from sim import Simulation, STATIONS
+from telemetry import DeltaEncoder, keyframe, pack_frame, FRAME_DTYPE, station_view, vehicle_view
+from clock import FixedStepClock
+from profiling import TickProfiler
+from metrics import Registry, Gauge, Counter, Histogram, CountingJSON
+from recorder import Recorder
+from streams import seed_from_env
+from payloads import PayloadCache
+import replay
+import jsonbackend
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'eco_maas_cyberpunk'
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Socket.IO 封包的 JSON 編碼器：JSON_BACKEND=auto (orjson > ujson > json) / orjson / ujson / json
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+wire_json = CountingJSON(jsonbackend.load(JSON_BACKEND))
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE, json=wire_json)
 
 # 金門景點真實圖文卡
 ATTRACTIONS = {
@@ -19,126 +46,274 @@ ATTRACTIONS = {
     7: {"name": "古寧頭戰史館", "desc": "1949古寧頭大捷紀念館", "img": "https://kinmen.travel/upload/album/202203/20220314165314_771.jpg"}
 }
 
-# 站點座標完全對應你設計稿
-stations = [
-    {"id":0, "name":"文化園區 (總站)", "x":950, "y":200, "is_hub":True, "waiting":0, "type":"hub"},
-    {"id":1, "name":"山后民俗村", "x":1150, "y":150, "is_hub":False, "waiting":0, "type":"spot"},
-    {"id":2, "name":"獅山砲陣地", "x":1250, "y":300, "is_hub":False, "waiting":0, "type":"spot"},
-    {"id":3, "name":"太武山", "x":800, "y":400, "is_hub":False, "waiting":0, "type":"spot"},
-    {"id":4, "name":"陳景蘭洋樓", "x":650, "y":600, "is_hub":False, "waiting":0, "type":"spot"},
-    {"id":5, "name":"翟山坑道", "x":250, "y":700, "is_hub":False, "waiting":0, "type":"spot"},
-    {"id":6, "name":"莒光樓 (市區)", "x":200, "y":450, "is_hub":True, "waiting":0, "type":"hub"},
-    {"id":7, "name":"古寧頭", "x":200, "y":200, "is_hub":False, "waiting":0, "type":"spot"},
-]
-
-class Vehicle:
-    def __init__(self, uid):
-        self.id = uid
-        self.progress = random.random()
-        self.speed = 0.0
-        self.soc = random.uniform(45, 95)
-        self.state = "MOVING"
-        self.action = "CRUISE"
-        self.platooning = False
-        self.cd = 0.8
-        self.passengers = 0
-
-    def update(self, dt, all_vehicles, wind, decision):
-        # Layer 2: Platooning
-        min_dist = min((min(abs((o.progress - self.progress)%1), 1-abs((o.progress - self.progress)%1)) * 15000 
-                       for o in all_vehicles if o.id != self.id), default=99999)
-        
-        self.platooning = 20 < min_dist < 70
-        self.cd = 0.4 if self.platooning else 0.8
-        self.action = "PLATOONING" if self.platooning else ("CHARGING" if self.state=="CHARGING" else "CRUISE")
-
-        # Layer 1 充電指令
-        if decision.get("charge_vehicle") == self.id and self.state != "CHARGING":
-            self.state = "RETURN_HUB"
-
-        # 到充電站
-        for s in stations:
-            if s["is_hub"] and abs(self.progress - s["id"]/8) < 0.02 and self.state == "RETURN_HUB":
-                self.state = "CHARGING"
-
-        if self.state == "CHARGING":
-            self.speed = 0
-            self.soc = min(100, self.soc + 30*dt)
-            if self.soc > 98: self.state = "MOVING"
-            return
-
-        target = 16 if self.platooning else 12
-        if self.soc < 25: target = 8
-
-        self.speed += (target - self.speed) * 3 * dt
-        self.progress = (self.progress + self.speed * dt / 15000) % 1
-
-        power = 0.0008 * self.cd * (self.speed**3) * (1 + (wind-12)*0.04) * dt
-        self.soc -= power
-
-        # 上下客
-        for s in stations:
-            if abs(self.progress - s["id"]/8) < 0.015 and random.random() < 0.4:
-                if s["waiting"] > 0 and self.passengers == 0:
-                    take = min(s["waiting"], 12)
-                    self.passengers = take
-                    s["waiting"] -= take
-                    self.state = "BOARDING"
-                    threading.Timer(4, lambda: setattr(self, "state", "MOVING")).start()
-                elif self.passengers > 0:
-                    self.passengers = 0
-                    self.state = "BOARDING"
-                    threading.Timer(2, lambda: setattr(self, "state", "MOVING")).start()
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "progress": self.progress,
-            "speed": round(self.speed*3.6, 1),
-            "soc": round(self.soc, 1),
-            "state": self.state,
-            "action": self.action,
-            "platooning": self.platooning,
-            "cd": round(self.cd, 2),
-            "passengers": self.passengers
-        }
-
-vehicles = [Vehicle(i) for i in range(5)]
-wind_speed = 12.0
-
-def fleet_manager():
-    low_veh = [v for v in vehicles if v.soc < 30]
-    total_wait = sum(s["waiting"] for s in stations)
-    return {"charge_vehicle": min(low_veh, key=lambda v:v.soc).id if low_veh and total_wait < 25 else None}
+# 執行期間不會變的資料 (景點圖文、站點名稱座標)：只透過可快取的 HTTP 端點送一次
+STATION_META_FIELDS = ("id", "name", "x", "y", "is_hub", "type")
+METADATA = json.dumps({
+    "attractions": ATTRACTIONS,
+    "stations": [{k: s[k] for k in STATION_META_FIELDS} for s in STATIONS],
+    "track_m": TRACK_M,
+    "frame": {"record_size": FRAME_DTYPE.itemsize, "states": STATES, "actions": ACTIONS},
+}, ensure_ascii=False, sort_keys=True).encode()
+META_VERSION = hashlib.sha1(METADATA).hexdigest()[:12]
+META_MODIFIED = time.time()
 
-def sim_loop():
-    global wind_speed
-    while True:
-        dt = 0.1
-        wind_speed = 10 + 9*math.sin(time.time()/25)
+NUM_VEHICLES = int(os.environ.get("NUM_VEHICLES", 5))
+profiler = TickProfiler()
+DEMAND = os.environ.get("DEMAND", "flat")   # 需求時段剖面名稱或人數 CSV 路徑
+# sim 執行緒每個 tick 發布唯讀的 sim.snapshot；推播、連線事件、REST 端點都只讀它
+sim = Simulation(NUM_VEHICLES, seed=seed_from_env(), profiler=profiler, snapshots=True, demand=DEMAND,
+                 start_hour=float(os.environ.get("START_HOUR", 0)))
+stations, fleet, vehicles = sim.stations, sim.fleet, sim.vehicles
+fleet_manager = sim.fleet_manager
+
+# json: keyframe + 差量 'update'；binary: 每 tick 一個打包好的 'frame' (二進位附件)
+TELEMETRY_FORMAT = os.environ.get("TELEMETRY_FORMAT", "json")
+KEYFRAME_EVERY = 50  # 每 50 次廣播一次完整 keyframe，中間只送差量
+encoder = DeltaEncoder(KEYFRAME_EVERY)
+# 每個快照的封包只編碼一次 (RawJSON)，推播、連線 / resync、/api/state 共用
+payload_cache = PayloadCache(wire_json.backend.dumps)
+
+def keyframe_json():
+    """剛連線 / resync 的 keyframe 用推播最後一次編碼的快照：差量的比對基準就是它，
+    用更新的 sim.snapshot 的話，沒有 dead-band 的欄位 (state、action…) 可能一直錯到下個 keyframe"""
+    seq, snap = encoder.last or (encoder.seq, sim.snapshot)
+    return payload_cache.get(snap, ("keyframe", seq), lambda: keyframe(snap, seq))
+
+# 物理步頻與廣播頻率分開設定，例如 SIM_HZ=50 BROADCAST_HZ=5；客戶端用 vel 外插兩次廣播之間的位置
+SIM_HZ = float(os.environ.get("SIM_HZ", 10))
+BROADCAST_HZ = float(os.environ.get("BROADCAST_HZ", 10))
+BROADCAST_EVERY = max(1, round(SIM_HZ / BROADCAST_HZ))
+clock = FixedStepClock(SIM_HZ, max_substeps=5, sleep=socketio.sleep)  # 協程模式下 sleep 要讓出控制權
+
+# 設定 RECORD_DIR 就把每個 tick 的快照寫成欄式 chunk 檔 (事後重播 / 分析用)
+RECORD_DIR = os.environ.get("RECORD_DIR")
+recorder = Recorder(RECORD_DIR, [{k: s[k] for k in STATION_META_FIELDS} for s in STATIONS], clock.dt) if RECORD_DIR else None
+# 重播：客戶端以 ?replay=<session>&speed=20&t=<模擬秒> 連線，各自一個背景任務讀檔推送，不經過 sim 執行緒
+REPLAY_DIR = os.environ.get("REPLAY_DIR", RECORD_DIR)
+replays = {}   # sid -> ReplaySession
 
-        if random.random() < 0.25:
-            s = random.choice([s for s in stations if not s["is_hub"]])
-            s["waiting"] += random.randint(1,5)
+# Prometheus 指標：由 sim 執行緒 / 連線事件更新，/metrics 只負責輸出
+registry = Registry()
+m_tick = registry.add(Histogram("ecomaas_tick_seconds", "Wall time of one sim loop iteration (physics + broadcast)", profiler.stats["tick"]))
+m_emit = registry.add(Histogram("ecomaas_emit_seconds", "socketio.emit latency", profiler.stats["emit"]))
+m_lag = registry.add(Gauge("ecomaas_tick_lag_seconds", "How far the sim loop woke up behind its deadline"))
+m_late = registry.add(Counter("ecomaas_ticks_late_total", "Loop wakeups that missed more than one deadline"))
+m_skipped = registry.add(Counter("ecomaas_ticks_skipped_total", "Physics steps dropped beyond max_substeps"))
+m_clients = registry.add(Gauge("ecomaas_socketio_clients", "Connected Socket.IO clients"))
+m_bytes = registry.add(Counter("ecomaas_emitted_bytes_total", "Bytes broadcast to clients (payload size x clients)"))
+m_soc = registry.add(Gauge("ecomaas_fleet_soc_vehicles", "Vehicles with SoC <= le percent", ("le",)))
+m_wait = registry.add(Gauge("ecomaas_station_waiting_passengers", "Passengers queued per station", ("station", "name")))
+m_threads = registry.add(Gauge("ecomaas_threads", "Live Python threads"))
+m_rec_dropped = registry.add(Counter("ecomaas_recorder_dropped_ticks_total", "Ticks not recorded because the writer queue was full"))
+SOC_EDGES = (10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
 
-        decision = fleet_manager()
-        for v in vehicles: v.update(dt, vehicles, wind_speed, decision)
+def update_gauges(snap):
+    m_lag.set(clock.lag)
+    m_late.set(clock.late)
+    m_skipped.set(clock.skipped)
+    counts = np.searchsorted(np.sort(snap.cols["soc"]), SOC_EDGES, side="right")
+    for edge, n in zip(SOC_EDGES, counts.tolist()): m_soc.set(n, edge)
+    m_soc.set(snap.n, "+Inf")
+    for s, w in zip(STATIONS, snap.waiting.tolist()): m_wait.set(w, s["id"], s["name"])
+    m_threads.set(threading.active_count())
+    if recorder: m_rec_dropped.set(recorder.dropped)
 
-        socketio.emit('update', {
-            "vehicles": [v.to_dict() for v in vehicles],
-            "stations": stations.copy(),
-            "wind": round(wind_speed,1),
-            "attractions": ATTRACTIONS
-        })
-        time.sleep(dt)
+# 訂閱房間：fleet (整個車隊，預設)、station:<id> (站牌顯示器)、vehicle:<id> (單車詳細)
+client_rooms = {}                      # sid -> 已加入的房間
+room_members = collections.Counter()   # 房間 -> 人數，只替有人的房間準備封包
+
+def room_payloads(snap):
+    """每個有人訂閱的房間算一次封包：[(房間, 事件, 內容)]"""
+    out = []
+    if room_members["fleet"]:
+        if TELEMETRY_FORMAT == "binary":
+            out.append(("fleet", 'frame', {
+                "wind": snap.wind,
+                "waiting": snap.waiting.tolist(),
+                "data": pack_frame(snap.cols)
+            }))
+        else:
+            out.append(("fleet", 'update', payload_cache.get(snap, "update", lambda: encoder.encode(snap))))
+    for room, n in list(room_members.items()):
+        if not n or room == "fleet": continue
+        kind, idx = room.split(":")
+        if kind == "station":
+            build = lambda: station_view(snap, int(idx), fleet.stops.station_pos[int(idx)])
+        else:
+            build = lambda: vehicle_view(snap, int(idx))
+        out.append((room, kind, payload_cache.get(snap, room, build)))
+    return out
+
+def broadcast():
+    snap = sim.snapshot
+    with profiler.phase("serialize"):
+        payloads = room_payloads(snap)
+    for room, event, payload in payloads:
+        with profiler.phase("emit"):
+            socketio.emit(event, payload, to=room)
+        m_bytes.inc(packet_size(event, payload) * room_members[room])
+    update_gauges(snap)
+
+def packet_size(event, payload):
+    """一則推播的大小：["事件",內容] 外框 + 內容 (RawJSON) 或 frame 的欄位 + 二進位附件。
+    不讀 wire_json.last_size，連線 / resync、重播執行緒隨時會蓋掉它"""
+    if event == 'frame':
+        head = {k: v for k, v in payload.items() if k != "data"}
+        return len(event) + 5 + len(wire_json.backend.dumps(head)) + len(payload["data"])
+    return len(event) + 5 + len(payload)
+
+def sim_loop():
+    next_broadcast = 0
+    while True:
+        steps = clock.wait()
+        with profiler.phase("tick"):
+            for _ in range(steps):
+                sim.step(clock.dt)
+                if recorder: recorder.record(sim.snapshot)
+            if clock.ticks >= next_broadcast:
+                next_broadcast = clock.ticks + BROADCAST_EVERY
+                broadcast()
 
 @app.route('/')
 def index(): return render_template('index.html')
 
+def metadata_response(immutable):
+    resp = Response(METADATA, mimetype='application/json')
+    resp.set_etag(META_VERSION)
+    resp.last_modified = META_MODIFIED
+    if immutable:
+        resp.cache_control.public = True
+        resp.cache_control.max_age = 31536000
+        resp.cache_control.immutable = True
+    else:
+        resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+@app.route('/debug/clock')
+def clock_stats(): return jsonify(clock.stats())
+
+@app.route('/debug/tick-profile')
+def tick_profile():
+    return jsonify({"budget_ms": round(1000 / SIM_HZ, 1), "phases": profiler.summary()})
+
+@app.route('/api/state')
+def state():
+    snap = sim.snapshot
+    seq = encoder.seq
+    body = payload_cache.get(snap, ("state", seq),
+                             lambda: keyframe(snap, seq) | {"t": round(snap.t, 2), "tick": snap.seq, "seed": sim.streams.seed})
+    return Response(body, mimetype='application/json')
+
+@app.route('/api/recordings')
+def recordings():
+    return jsonify(replay.sessions(REPLAY_DIR))
+
+@app.route('/metrics')
+def metrics():
+    return Response(registry.exposition(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metadata')
+def metadata(): return metadata_response(immutable=False)
+
+@app.route('/api/metadata/<version>')
+def metadata_versioned(version):
+    if version != META_VERSION: abort(404)
+    return metadata_response(immutable=True)
+
+def room_for(data):
+    """{"fleet": true} / {"station": 3} / {"vehicle": 7} -> 房間名稱，不合法回傳 None"""
+    data = data or {}
+    if data.get("fleet"): return "fleet"
+    for kind, limit in (("station", len(stations)), ("vehicle", fleet.n)):
+        try:
+            i = int(data[kind])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= i < limit: return f"{kind}:{i}"
+    return None
+
+def subscribe_room(room):
+    if room in client_rooms[request.sid]: return
+    join_room(room)
+    client_rooms[request.sid].add(room)
+    room_members[room] += 1
+    if room == "fleet": resync()
+
 @socketio.on('connect')
 def connect():
-    socketio.emit('config', {"stations": stations})
+    m_clients.inc()
+    client_rooms[request.sid] = set()
+    emit('config', {"meta_version": META_VERSION, "meta_url": f"/api/metadata/{META_VERSION}"})
+    if request.args.get("replay"):
+        return start_replay(request.args)
+    # 站牌顯示器可直接用 ?station=3 連線，只收該站的精簡封包；其餘預設訂閱整個車隊
+    subscribe_room(room_for(request.args) or "fleet")
+
+def start_replay(args):
+    rec = replay.open_session(REPLAY_DIR, args["replay"])
+    if rec is None or not len(rec):
+        emit('replay_end', {"error": "unknown recording"})
+        return
+    try:
+        session = replay.ReplaySession(rec, args.get("speed", 1, type=float), args.get("t", type=float), KEYFRAME_EVERY)
+    except ValueError as e:
+        emit('replay_end', {"error": str(e)})
+        return
+    replays[request.sid] = session
+    sid = request.sid
+    socketio.start_background_task(session.run, lambda event, data: socketio.emit(event, data, to=sid),
+                                   socketio.sleep, BROADCAST_HZ)
+
+@socketio.on('replay_control')
+def replay_control(data):
+    """{"seek": 模擬秒} / {"speed": 1~100}，回傳目前播放狀態；參數不對回傳 {"error": ...}，播放不受影響"""
+    session = replays.get(request.sid)
+    if session is None: return None
+    if not isinstance(data, dict): return {"error": "expected {\"seek\": t} or {\"speed\": x}"}
+    try:
+        speed = replay.parse_finite(data["speed"]) if "speed" in data else None
+        seek = replay.parse_finite(data["seek"]) if "seek" in data else None
+    except (TypeError, ValueError) as e:
+        return {"error": f"bad replay_control: {e}"}
+    if speed is not None: session.set_speed(speed)
+    if seek is not None: session.seek(seek)
+    return session.status()
+
+@socketio.on('disconnect')
+def disconnect(*args):
+    m_clients.dec()
+    session = replays.pop(request.sid, None)
+    if session: session.stop()
+    for room in client_rooms.pop(request.sid, ()):
+        room_members[room] -= 1
+
+@socketio.on('subscribe')
+def subscribe(data):
+    room = room_for(data)
+    if room: subscribe_room(room)
+    return room
+
+@socketio.on('unsubscribe')
+def unsubscribe(data):
+    room = room_for(data)
+    if room in client_rooms.get(request.sid, ()):
+        leave_room(room)
+        client_rooms[request.sid].discard(room)
+        room_members[room] -= 1
+    return room
+
+@socketio.on('resync')
+def resync():
+    session = replays.get(request.sid)
+    if session:
+        packet = session.keyframe()
+        if packet: emit('update', packet)
+        return
+    emit('update', keyframe_json())
 
 if __name__ == '__main__':
-    threading.Thread(target=sim_loop, daemon=True).start()
-    socketio.run(app, port=5000, debug=True)
\ No newline at end of file
+    if recorder: atexit.register(recorder.close)
+    socketio.start_background_task(sim_loop)
+    # threading 模式用 Werkzeug 開發伺服器，關掉 DEBUG 時 Flask-SocketIO 需要明確允許
+    socketio.run(app, port=int(os.environ.get("PORT", 5000)), debug=os.environ.get("DEBUG", "1") == "1",
+                 allow_unsafe_werkzeug=ASYNC_MODE == "threading")
\ No newline at end of file
@@ -0,0 +1,14 @@
+# benchmarks - asv 效能測試 (bench_core.py、bench_kimen.py) 與獨立壓測腳本 (bench_fanout.py、bench_json.py)
+#
+#   asv machine --yes
+#   asv run                            # 目前的 commit
+#   asv continuous master HEAD -f 1.1  # 與 master 比較，任一項慢 10% 以上就回傳非 0 (CI 每次變更都跑)
+#   asv publish && asv preview         # 歷次結果的趨勢圖
+#   asv run --python=same --quick      # 不建環境，直接用目前的 Python 快速跑一遍
+#
+# asv 會把每個 commit 的原始碼放進 .pth 指向的目錄；直接在工作目錄跑時退回 repo 根目錄
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
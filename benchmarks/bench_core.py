@@ -0,0 +1,99 @@
+# bench_core.py - 模擬核心的 asv 效能測試：車隊物理步、fleet_manager / 充電調度、序列化與推播編碼
+# 原本逐台的 Vehicle.update 已由向量化的 Fleet.step 取代，這裡量的是整個車隊一步的成本
+from sim import Simulation
+from telemetry import DeltaEncoder, keyframe, pack_frame
+from metrics import CountingJSON
+import jsonbackend
+
+SIZES = [5, 50, 500, 5000]
+
+
+def warm_sim(n, steps=50, **kwargs):
+    sim = Simulation(n, seed=0, **kwargs)
+    for _ in range(steps):
+        sim.step(0.1)
+    return sim
+
+
+class FleetStep:
+    params = SIZES
+    param_names = ["vehicles"]
+
+    def setup(self, n):
+        self.sim = warm_sim(n)
+
+    def time_fleet_step(self, n):
+        """只量物理步：不帶充電指令 (指令由 FleetManager 那組量)"""
+        self.sim.fleet.step(0.1, 12.0, {})
+
+    def time_sim_step(self, n):
+        """需求 + fleet_manager + 車隊物理步"""
+        self.sim.step(0.1)
+
+
+class FleetManager:
+    params = SIZES
+    param_names = ["vehicles"]
+
+    def setup(self, n):
+        # 門檻調高讓大部分車都低於門檻：legacy 量遮罩 argmin 挑一台，dispatch 量候選篩選 + 指派求解
+        self.sim = warm_sim(n, charge_soc=90)
+        self.legacy = warm_sim(n, charge_soc=90, dispatch_every=None)
+
+    def time_fleet_manager(self, n):
+        self.legacy.fleet_manager()
+
+    def time_dispatch_plan(self, n):
+        sim = self.sim
+        sim.dispatcher.plan(sim.fleet, sim.low_soc(), 0)
+
+
+class Serialization:
+    params = SIZES
+    param_names = ["vehicles"]
+
+    def setup(self, n):
+        sim = warm_sim(n, snapshots=True)
+        self.fleet = sim.fleet
+        self.a = sim.snapshot
+        sim.step(0.1)
+        self.b = sim.snapshot
+        self.encoder = DeltaEncoder(keyframe_every=10**9)
+        self.encoder.encode(self.a)
+        self.payload = keyframe(self.b, 1)
+
+    def time_vehicle_to_dict(self, n):
+        [v.to_dict() for v in self.fleet.vehicles]
+
+    def time_fleet_to_dicts(self, n):
+        self.fleet.to_dicts()
+
+    def time_keyframe(self, n):
+        keyframe(self.b, 1)
+
+    def time_delta_encode(self, n):
+        # 兩個快照交替，每次都是真的一個 tick 的差量
+        self.encoder.encode(self.b)
+        self.encoder.encode(self.a)
+
+    def time_pack_frame(self, n):
+        pack_frame(self.b.cols)
+
+    def track_keyframe_bytes(self, n):
+        return len(CountingJSON().dumps(["update", self.payload]))
+
+    track_keyframe_bytes.unit = "bytes"
+
+
+class EmitEncode:
+    """Socket.IO 封包編碼 (CountingJSON + 各 JSON 後端)"""
+    params = ([5, 500, 5000], jsonbackend.available())
+    param_names = ["vehicles", "backend"]
+
+    def setup(self, n, backend):
+        sim = warm_sim(n, snapshots=True)
+        self.wire = CountingJSON(jsonbackend.load(backend))
+        self.packet = ["update", keyframe(sim.snapshot, 1)]
+
+    def time_emit_keyframe(self, n, backend):
+        self.wire.dumps(self.packet, separators=(",", ":"))
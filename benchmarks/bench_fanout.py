@@ -0,0 +1,100 @@
+# bench_fanout.py - Socket.IO 廣播延遲壓測：啟動 app.py (指定 ASYNC_MODE)，連上 N 個模擬客戶端，量測 emit 延遲
+#   python benchmarks/bench_fanout.py --mode eventlet --clients 1000 5000
+#   需要 aiohttp (python-socketio 的 AsyncClient) 與對應的 eventlet / gevent
+#
+# 兩個數字：
+#   emit p50/p95/p99 - 伺服器端 socketio.emit 本身的耗時 (/debug/tick-profile 的 emit 階段)
+#   spread p50/p95/p99 - 同一個 seq 最早與最晚送達客戶端的時間差，代表扇出到最後一個客戶端要多久
+import argparse, asyncio, json, multiprocessing as mp, os, subprocess, sys, time, urllib.request
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(mode, port, vehicles):
+    env = {**os.environ, "ASYNC_MODE": mode, "PORT": str(port), "DEBUG": "0", "NUM_VEHICLES": str(vehicles)}
+    proc = subprocess.Popen([sys.executable, "app.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            get_json(port, "/debug/clock")
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    sys.exit("server did not start")
+
+
+def get_json(port, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as r:
+        return json.load(r)
+
+
+async def _clients(port, n, seconds, out):
+    import socketio
+    recv = {}   # seq -> [接收時間...]
+
+    async def one():
+        sio = socketio.AsyncClient(reconnection=False)
+        sio.on("update", lambda data: recv.setdefault(data["seq"], []).append(time.time()))
+        await sio.connect(f"http://127.0.0.1:{port}", transports=["websocket"])
+        return sio
+
+    clients = []
+    for i in range(0, n, 100):   # 分批連線，避免瞬間湧入
+        clients += await asyncio.gather(*(one() for _ in range(min(100, n - i))))
+    recv.clear()
+    await asyncio.sleep(seconds)
+    await asyncio.gather(*(c.disconnect() for c in clients))
+    out.put({seq: ts for seq, ts in recv.items()})
+
+
+def _client_proc(port, n, seconds, out):
+    asyncio.run(_clients(port, n, seconds, out))
+
+
+def measure(port, n_clients, seconds, procs):
+    """把客戶端分散到多個行程 (單一行程的 asyncio 也會成為瓶頸)，回傳各 seq 的送達時間差"""
+    out = mp.Queue()
+    per = [n_clients // procs + (i < n_clients % procs) for i in range(procs)]
+    workers = [mp.Process(target=_client_proc, args=(port, k, seconds, out)) for k in per if k]
+    for w in workers:
+        w.start()
+    merged = {}
+    for _ in workers:
+        for seq, ts in out.get().items():
+            merged.setdefault(seq, []).extend(ts)
+    for w in workers:
+        w.join()
+    # 只取所有客戶端都收到的 seq
+    spreads = [max(ts) - min(ts) for ts in merged.values() if len(ts) >= n_clients]
+    return np.array(spreads)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Socket.IO fan-out latency benchmark")
+    ap.add_argument("--mode", default="eventlet", choices=("threading", "eventlet", "gevent"))
+    ap.add_argument("--clients", type=int, nargs="+", default=[1000, 5000])
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--procs", type=int, default=os.cpu_count())
+    ap.add_argument("--vehicles", type=int, default=5)
+    ap.add_argument("--port", type=int, default=5055)
+    args = ap.parse_args()
+
+    print(f"mode={args.mode} vehicles={args.vehicles}")
+    print(f"{'clients':>8} {'emit p50':>9} {'p95':>8} {'p99':>8} {'spread p50':>11} {'p95':>8} {'p99':>8} {'frames':>7}  (ms)")
+    for n in args.clients:
+        server = start_server(args.mode, args.port, args.vehicles)
+        try:
+            spreads = measure(args.port, n, args.seconds, min(args.procs, n))
+            emit = get_json(args.port, "/debug/tick-profile")["phases"]["emit"]
+        finally:
+            server.kill()
+            server.wait()
+        sp = np.percentile(spreads, (50, 95, 99)) * 1000 if spreads.size else [float("nan")] * 3
+        print(f"{n:>8} {emit['p50_ms']:>9.2f} {emit['p95_ms']:>8.2f} {emit['p99_ms']:>8.2f} "
+              f"{sp[0]:>11.2f} {sp[1]:>8.2f} {sp[2]:>8.2f} {spreads.size:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bench_json.py - JSON 後端比較：各車隊規模下 keyframe / 差量 / 原始欄位陣列的編碼時間與封包大小
+#   python benchmarks/bench_json.py --vehicles 5 500 5000
+#   沒裝的後端 (orjson / ujson) 會自動略過
+#
+# 三種封包：
+#   keyframe - 完整車隊 (list[dict])，連線 / resync / 每 50 次廣播送一次
+#   delta    - 一般 tick 的差量 (欄位導向的 list)
+#   columns  - Snapshot.cols 的 NumPy 陣列直接編碼 (測後端對 NumPy 的原生支援)
+import argparse, os, sys, timeit
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import jsonbackend
+from sim import Simulation
+from telemetry import DeltaEncoder, keyframe, pack_frame
+
+
+def payloads(n, seed=0, warmup=50):
+    sim = Simulation(n, seed=seed, snapshots=True)
+    enc = DeltaEncoder(keyframe_every=10**9)
+    for _ in range(warmup):
+        sim.step(0.1)
+        enc.encode(sim.snapshot)
+    sim.step(0.1)
+    snap = sim.snapshot
+    return snap, {
+        "keyframe": keyframe(snap, enc.seq),
+        "delta": enc.encode(snap),
+        "columns": dict(snap.cols, waiting=snap.waiting),
+    }
+
+
+def bench(dumps, obj, min_time=0.2):
+    """回傳 (每次編碼中位數秒數, 位元組數)"""
+    timer = timeit.Timer(lambda: dumps(obj))
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = timer.repeat(5, number)
+    return np.median(runs) / number, len(dumps(obj).encode())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="JSON backend encode benchmark")
+    ap.add_argument("--vehicles", type=int, nargs="+", default=[5, 500, 5000])
+    ap.add_argument("--backends", nargs="+", default=jsonbackend.available())
+    args = ap.parse_args()
+
+    print(f"backends: {', '.join(args.backends)}")
+    print(f"{'vehicles':>8} {'payload':>9} {'backend':>8} {'encode us':>10} {'bytes':>9} {'vs json':>8}")
+    for n in args.vehicles:
+        snap, cases = payloads(n)
+        for name, obj in cases.items():
+            results = {b: bench(jsonbackend.load(b).dumps, obj) for b in args.backends}
+            base = results.get("json", (None,))[0]
+            for backend, (sec, size) in results.items():
+                ratio = f"{base / sec:.1f}x" if base else ""
+                print(f"{n:>8} {name:>9} {backend:>8} {sec * 1e6:>10.1f} {size:>9} {ratio:>8}")
+        print(f"{n:>8} {'binary':>9} {'frame':>8} {'':>10} {len(pack_frame(snap.cols)):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# bench_kimen.py - kimen.py (pygame 版監控畫面) 的 asv 效能測試：感測函式與完整一個畫面 (SDL dummy 視訊驅動，不開視窗)
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+try:
+    import pygame
+    import kimen
+except ImportError:   # 沒裝 pygame 的環境略過這組
+    kimen = None
+
+
+def make_fleet(n):
+    track = kimen.Track()
+    return track, [kimen.Vehicle(i, track, int(i / n * len(track.points)), 80.0) for i in range(n)]
+
+
+class KimenSensing:
+    params = [5, 50, 500]
+    param_names = ["vehicles"]
+
+    def setup(self, n):
+        if kimen is None:
+            raise NotImplementedError("pygame not installed")
+        self.track, self.vehicles = make_fleet(n)
+
+    def time_sense_front(self, n):
+        for v in self.vehicles:
+            v.sense_front(self.vehicles)
+
+    def time_check_station(self, n):
+        for v in self.vehicles:
+            v.check_station()
+
+
+class KimenFrame:
+    params = [5, 50]
+    param_names = ["vehicles"]
+
+    def setup(self, n):
+        if kimen is None:
+            raise NotImplementedError("pygame not installed")
+        pygame.init()
+        self.screen = pygame.display.set_mode((kimen.WIDTH, kimen.HEIGHT))
+        self.track, self.vehicles = make_fleet(n)
+        self.t = 0.0
+        kimen.frame(self.screen, self.track, self.vehicles, 0, self.t)   # 字型快取等第一次的成本不算
+
+    def teardown(self, n):
+        if kimen is not None:   # setup 略過時 asv 仍會呼叫 teardown
+            pygame.quit()
+
+    def time_frame(self, n):
+        self.t += 1 / kimen.FPS
+        kimen.frame(self.screen, self.track, self.vehicles, 0, self.t)
@@ -0,0 +1,41 @@
+# bench_recorder.py - 錄製對 sim 執行緒的額外成本：同一個種子的模擬步，量 sim.step 與 recorder.record 各自的 CPU 時間
+#   python benchmarks/bench_recorder.py --vehicles 5 500 5000 --ticks 3000
+#   用 thread_time 只算 sim 執行緒本身，寫入執行緒在背景寫檔不計入 (單核機器上它會搶 CPU，但不會讓 tick 變長)
+import argparse, os, sys, tempfile, time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sim import Simulation
+from recorder import Recorder
+
+
+def measure(n, ticks, dt=0.1, seed=0):
+    sim = Simulation(n, seed=seed, snapshots=True)
+    step = record = 0.0
+    with tempfile.TemporaryDirectory() as root:
+        rec = Recorder(root, sim.stations, dt)
+        for _ in range(ticks):
+            t0 = time.thread_time()
+            sim.step(dt)
+            t1 = time.thread_time()
+            rec.record(sim.snapshot)
+            t2 = time.thread_time()
+            step += t1 - t0
+            record += t2 - t1
+        rec.close()
+        return step / ticks, record / ticks, rec.chunk_ticks, rec.chunks, rec.dropped
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Recorder overhead on the simulation thread")
+    ap.add_argument("--vehicles", type=int, nargs="+", default=[5, 500, 5000])
+    ap.add_argument("--ticks", type=int, default=3000)
+    args = ap.parse_args()
+
+    print(f"{'vehicles':>8} {'step us':>9} {'record us':>10} {'overhead':>9} {'chunk':>6} {'chunks':>7} {'dropped':>8}")
+    for n in args.vehicles:
+        step, record, chunk, chunks, dropped = measure(n, args.ticks)
+        print(f"{n:>8} {step * 1e6:>9.1f} {record * 1e6:>10.1f} {record / step:>8.1%} {chunk:>6} {chunks:>7} {dropped:>8}")
+
+
+if __name__ == "__main__":
+    main()
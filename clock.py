@@ -0,0 +1,57 @@
+# clock.py - 固定步長排程：以 monotonic 時鐘的截止時間推進，不會因為 tick 本身耗時而越跑越慢
+import time
+
+
+class FixedStepClock:
+    """
+    每 1/rate_hz 秒一個截止時間。wait() 睡到下一個截止時間，回傳這次該跑幾個物理步：
+    正常為 1；tick 超時就補跑 (最多 max_substeps)，再落後的步數直接丟棄並計入 skipped，避免越補越慢。
+    """
+    def __init__(self, rate_hz, max_substeps=5, clock=time.monotonic, sleep=time.sleep):
+        self.dt = 1.0 / rate_hz
+        self.rate_hz = rate_hz
+        self.max_substeps = max_substeps
+        self._clock, self._sleep = clock, sleep
+        self.deadline = None
+        self.ticks = 0        # 已執行的物理步
+        self.late = 0         # 醒來時已錯過不只一個截止時間的次數
+        self.skipped = 0      # 超過 max_substeps 而丟棄的步數
+        self.overrun = 0.0    # 累計超時秒數
+        self.lag = 0.0        # 最近一次醒來時落後截止時間多少秒
+        self.achieved_hz = 0.0
+        self._win_t, self._win_ticks = None, 0
+
+    def wait(self):
+        now = self._clock()
+        if self.deadline is None:
+            self.deadline = self._win_t = now
+        elif now < self.deadline:
+            self._sleep(self.deadline - now)
+            now = self._clock()
+
+        self.lag = now - self.deadline
+        due = int(self.lag / self.dt) + 1
+        if due > 1:
+            self.late += 1
+            self.overrun += now - self.deadline
+        steps = min(due, self.max_substeps)
+        self.skipped += due - steps
+        self.deadline += due * self.dt
+        self.ticks += steps
+
+        # 每秒更新一次實際步頻
+        self._win_ticks += steps
+        if now - self._win_t >= 1.0:
+            self.achieved_hz = self._win_ticks / (now - self._win_t)
+            self._win_t, self._win_ticks = now, 0
+        return steps
+
+    def stats(self):
+        return {
+            "target_hz": self.rate_hz,
+            "achieved_hz": round(self.achieved_hz, 2),
+            "ticks": self.ticks,
+            "late": self.late,
+            "skipped": self.skipped,
+            "overrun_s": round(self.overrun, 3),
+        }
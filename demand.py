@@ -0,0 +1,113 @@
+# demand.py - 乘客需求：各站 Poisson 到站率 × 時段剖面，或重播實際的人數 CSV；每 tick 一次 NumPy 呼叫產生全部站點的到站人數
+import csv
+import numpy as np
+
+DEMAND_RATE = 2.5 * 3   # 全線平均每秒到站人數 (原本每秒 2.5 批、每批 1~5 人)
+DAY = 86400
+
+# 時段剖面：每小時整點的倍率 (全天平均為 1)，中間線性內插
+PROFILES = {
+    "flat": np.ones(24),
+    "tourist": np.array([0.05, 0.02, 0.02, 0.02, 0.05, 0.15, 0.4, 0.8, 1.3, 1.8, 2.2, 2.2,
+                         1.8, 1.9, 2.1, 2.0, 1.7, 1.3, 1.0, 0.8, 0.6, 0.4, 0.2, 0.1]),
+}
+
+
+def _hms(s):
+    """CSV 時間欄：秒數或 HH:MM[:SS]"""
+    if ":" not in s:
+        return float(s)
+    parts = [float(x) for x in s.split(":")]
+    return sum(v * m for v, m in zip(parts, (3600, 60, 1)))
+
+
+class PoissonDemand:
+    """
+    每站一個到站率 (人/秒)，乘上時段倍率後 rng.poisson 一次抽完所有站。
+    rates 未指定時，DEMAND_RATE 平均分給非總站 (總站不產生需求)；start_hour 為模擬時間 0 對應的時刻。
+    """
+    def __init__(self, stations, rng, rates=None, profile="flat", start_hour=0.0):
+        self.rng = rng
+        if rates is None:
+            spot = np.array([not s["is_hub"] for s in stations], float)
+            rates = spot * DEMAND_RATE / max(spot.sum(), 1)
+        self.rates = np.asarray(rates, float)
+        hourly = PROFILES[profile] if isinstance(profile, str) else np.asarray(profile, float)
+        self.hourly = hourly / hourly.mean()
+        self.t0 = start_hour * 3600
+
+    def factor(self, t):
+        """時段倍率 (t 可為陣列)"""
+        hour = ((np.asarray(t) + self.t0) % DAY) / 3600
+        return np.interp(hour, np.arange(25), np.r_[self.hourly, self.hourly[0]])
+
+    def arrivals(self, t, dt):
+        return self.rng.poisson(self.rates * (self.factor(t) * dt))
+
+    def day(self, dt, hours=24.0):
+        """預先產生 hours 小時的到站人數表 (步數 × 站數)，headless 逐步取用"""
+        t = np.arange(int(round(hours * 3600 / dt))) * dt
+        lam = self.factor(t)[:, None] * self.rates[None, :] * dt
+        return self.rng.poisson(lam).astype(np.int32)
+
+
+class ReplayDemand:
+    """
+    重播人數 CSV：第一欄 time (秒或 HH:MM)，其餘每欄一站 (表頭為站 id 或站名)，值為該時間到下一列之間的到站人數。
+    區間內的人數以累計曲線線性攤開，每 tick 取整數差，總數與 CSV 完全一致。
+    CSV 每 period 秒 (預設一天) 重複一次：最後一列的區間延續到隔天第一列的時刻。
+    """
+    def __init__(self, path, stations, start_hour=0.0, period=DAY):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            table = [row for row in reader if row]
+        col = {str(s["id"]): i for i, s in enumerate(stations)}
+        col.update({s["name"]: i for i, s in enumerate(stations)})
+        missing = [h for h in header[1:] if h.strip() not in col]
+        if missing:
+            raise ValueError(f"{path}: unknown station column(s) {missing}")
+        idx = [col[h.strip()] for h in header[1:]]
+
+        times = np.array([_hms(r[0]) for r in table])
+        counts = np.zeros((len(table), len(stations)))
+        counts[:, idx] = np.array([[float(x or 0) for x in r[1:]] for r in table])
+        self.times = np.r_[times, times[0] + period]           # 區間端點，最後一段延續到下一輪第一列
+        self.cum = np.vstack([np.zeros(len(stations)), np.cumsum(counts, axis=0)])
+        self.period = period
+        self.t0 = start_hour * 3600
+
+    def _cum(self, t):
+        """時間 t (陣列) 的累計到站人數 (時間 × 站數)，每過一個 period 累加一整輪"""
+        t = np.asarray(t, float) + self.t0 - self.times[0]
+        laps, t = np.divmod(t, self.period)
+        t = t + self.times[0]
+        k = np.clip(np.searchsorted(self.times, t, side="right") - 1, 0, len(self.times) - 2)
+        w = ((t - self.times[k]) / (self.times[k + 1] - self.times[k]))[..., None]
+        return laps[..., None] * self.cum[-1] + self.cum[k] + w * (self.cum[k + 1] - self.cum[k])
+
+    def arrivals(self, t, dt):
+        c = np.floor(self._cum(np.array([t, t + dt])) + 1e-9)
+        return (c[1] - c[0]).astype(np.int64)
+
+    def day(self, dt, hours=24.0):
+        t = np.arange(int(round(hours * 3600 / dt)) + 1) * dt
+        return np.diff(np.floor(self._cum(t) + 1e-9), axis=0).astype(np.int32)
+
+
+class DemandTable:
+    """預先產生好的到站人數表，依模擬時間取列 (headless 用，每 tick 只是一次索引)"""
+    def __init__(self, table, dt):
+        self.table, self.dt = table, dt
+
+    def arrivals(self, t, dt):
+        return self.table[int(round(t / self.dt)) % len(self.table)]
+
+
+def make_demand(spec, stations, rng, start_hour=0.0):
+    """spec：時段剖面名稱、*.csv 路徑，或已建好的需求物件"""
+    if not isinstance(spec, str):
+        return spec
+    if spec.endswith(".csv"):
+        return ReplayDemand(spec, stations, start_hour)
+    return PoissonDemand(stations, rng, profile=spec, start_hour=start_hour)
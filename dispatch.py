@@ -0,0 +1,118 @@
+# dispatch.py - 充電調度：每隔幾秒把低電量車輛批次指派到各充電總站的空充電樁 (最小成本指派)
+import math
+import numpy as np
+from fleet import TRACK_M, CAPACITY, RETURN_HUB, CHARGING
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+# 成本權重：行駛距離 (每公里)、剩餘電量 (每 SoC 百分點，電量越低越優先)、車上乘客 (每人)
+W_DIST = 1.0
+W_SOC = 0.5
+W_PAX = 2.0
+
+
+def _hungarian(cost):
+    """最小成本指派 (最短增廣路徑法，O(n²m))，列數須 <= 行數；沒有 scipy 時使用"""
+    n, m = cost.shape
+    u, v = np.zeros(n + 1), np.zeros(m + 1)
+    match = np.zeros(m + 1, np.intp)           # 行 -> 列 (1 起算，0 表示未配對)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        way = np.zeros(m + 1, np.intp)
+        used = np.zeros(m + 1, bool)
+        while match[j0]:
+            used[j0] = True
+            i0 = match[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            j1 = int(np.argmin(np.where(free, minv[1:], np.inf))) + 1
+            delta = minv[j1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    cols = np.flatnonzero(match[1:])
+    rows = match[1:][cols] - 1
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def assign(cost):
+    """回傳 (列索引, 行索引)，與 scipy.optimize.linear_sum_assignment 相同"""
+    if not cost.size:
+        return np.zeros(0, np.intp), np.zeros(0, np.intp)
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+    if cost.shape[0] <= cost.shape[1]:
+        return _hungarian(cost)
+    cols, rows = _hungarian(cost.T)
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+class Dispatcher:
+    """
+    每 period 秒 (模擬時間) 解一次指派：候選車 × 各總站的空充電樁。
+    空樁 = 充電樁數 - 已在該站充電或正前往該站的車；成本 = 順行到該站的距離 + 電量 + 車上乘客。
+    全線排隊 >= max_wait 時只派 SoC < critical_soc 的車；否則仍保留足夠載完排隊人潮的車在線上。
+    """
+    def __init__(self, stations, stops, period=5.0, max_wait=25, critical_soc=15):
+        self.stops = stops
+        self.period = period
+        self.max_wait = max_wait
+        self.critical_soc = critical_soc
+        self.hubs = stops.hub_order                                 # 總站的 stations 索引
+        self.chargers = np.array([stations[h].get("chargers", 1) for h in self.hubs])
+        self.next_t = 0.0
+
+    def due(self, t):
+        if t < self.next_t:
+            return False
+        self.next_t = t + self.period
+        return True
+
+    def plan(self, fleet, candidates, total_wait):
+        """candidates：SoC 低於門檻的車輛編號。回傳 {車輛編號: 總站 stations 索引}"""
+        if not self.hubs.size or not len(candidates):
+            return {}
+        candidates = np.asarray(candidates, np.intp)
+        # 已有總站指派的車 (含途中停靠上下客、BOARDING 的) 不再重派，否則會佔掉第二個充電樁
+        st = fleet.state[candidates]
+        cand = candidates[(st != RETURN_HUB) & (st != CHARGING) & (fleet.target[candidates] < 0)]
+        soc = fleet.soc[cand]
+
+        # 服務需求：排隊過多只派緊急的車，否則派出後線上仍要有 ceil(排隊 / 載客量) 台車
+        critical = soc < self.critical_soc
+        if total_wait >= self.max_wait:
+            budget = 0
+        else:
+            out = np.isin(fleet.state, (RETURN_HUB, CHARGING)) | (fleet.target >= 0)
+            in_service = fleet.n - int(out.sum())
+            budget = max(0, in_service - int(critical.sum()) - math.ceil(total_wait / CAPACITY))
+        rest = np.flatnonzero(~critical)
+        keep = np.r_[np.flatnonzero(critical), rest[np.argsort(soc[rest], kind="stable")[:budget]]]
+        cand, soc = cand[keep], soc[keep]
+
+        # 充電樁展開成行：每個空樁一行
+        busy = np.bincount(fleet.target[fleet.target >= 0], minlength=len(fleet.stations))[self.hubs]
+        free = np.maximum(self.chargers - busy, 0)
+        slot_hub = np.repeat(self.hubs, free)
+        if not cand.size or not slot_hub.size:
+            return {}
+
+        dist_km = ((self.stops.station_pos[slot_hub][None, :] - fleet.progress[cand][:, None]) % 1) * TRACK_M / 1000
+        cost = W_DIST * dist_km + (W_SOC * soc + W_PAX * fleet.passengers[cand])[:, None]
+        r, c = assign(cost)
+        return dict(zip(cand[r].tolist(), slot_hub[c].tolist()))
@@ -0,0 +1,322 @@
+# fleet.py - 向量化車隊引擎：全車隊狀態存在 NumPy 連續陣列 (struct-of-arrays)，一個 tick 幾個陣列運算就更新完
+import bisect, heapq, itertools
+import numpy as np
+from streams import RngStreams
+
+TRACK_M = 15000  # 環線全長 (公尺)，progress 0~1 對應一圈
+CAPACITY = 12    # 每台車載客上限
+
+# 狀態 / 動作以 int8 編碼存放，輸出時再轉回字串
+STATES = ("MOVING", "RETURN_HUB", "CHARGING", "BOARDING")
+MOVING, RETURN_HUB, CHARGING, BOARDING = range(len(STATES))
+ACTIONS = ("CRUISE", "PLATOONING", "CHARGING")
+A_CRUISE, A_PLATOON, A_CHARGE = range(len(ACTIONS))
+
+
+class RingIndex:
+    """環線位置索引：依 progress 排序一次，前後車、間距都是 O(1) 查表，任意位置用 bisect 查"""
+    def __init__(self, progress):
+        self.n = len(progress)
+        self.order = np.argsort(progress, kind="stable")   # 依位置排序後的車輛編號
+        self.rank = np.empty(self.n, np.intp)              # 車輛編號 -> 排序位置
+        self.rank[self.order] = np.arange(self.n)
+        self.pos = progress[self.order]
+        gap = np.empty(self.n)                 # 與下一台的距離，最後一台繞回第一台
+        if self.n:
+            np.subtract(self.pos[1:], self.pos[:-1], out=gap[:-1])
+            gap[-1] = self.pos[0] + 1 - self.pos[-1]
+            gap *= TRACK_M
+        self.gap_ahead = np.empty(self.n)
+        self.gap_ahead[self.order] = gap
+        self.gap_behind = np.empty(self.n)
+        self.gap_behind[self.order[1:]] = gap[:-1]
+        self.gap_behind[self.order[:1]] = gap[-1:]
+
+    def ahead(self, i):
+        """正前方那台車的編號 (只有一台車時回傳自己)"""
+        return int(self.order[(self.rank[i] + 1) % self.n])
+
+    def behind(self, i):
+        return int(self.order[self.rank[i] - 1])
+
+    def ahead_all(self):
+        """每台車正前方車輛編號的陣列"""
+        return self.order[(self.rank + 1) % self.n]
+
+    def nearest_gap(self):
+        """每台車與最近鄰車的環上距離 (公尺)，沒有其他車時為 99999"""
+        if self.n < 2:
+            return np.full(self.n, 99999.0)
+        return np.minimum(self.gap_ahead, self.gap_behind)
+
+    def first_ahead_of(self, p):
+        """位置 p (可為陣列) 之後第一台車的編號與距離 (公尺)"""
+        k = np.searchsorted(self.pos, p, side="left") % self.n
+        return self.order[k], ((self.pos[k] - p) % 1) * TRACK_M
+
+    def approaching(self, p, k):
+        """即將抵達位置 p 的 k 台車 (p 後方最近的車，由近到遠) 的編號與距離 (公尺)"""
+        if not self.n:
+            return np.zeros(0, np.intp), np.zeros(0)
+        j = (np.searchsorted(self.pos, p, side="right") - 1 - np.arange(min(k, self.n))) % self.n
+        return self.order[j], ((p - self.pos[j]) % 1) * TRACK_M
+
+
+class EventQueue:
+    """模擬時間的事件排程 (heap)：停靠、延遲狀態轉換都排在這裡，每個 tick 開頭處理，不開執行緒"""
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()  # 同時間的事件依排入順序執行，結果可重現
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, t, fn, *args):
+        heapq.heappush(self._heap, (t, next(self._seq), fn, args))
+
+    def run_due(self, now):
+        """執行所有 t <= now 的事件，回傳執行數量"""
+        n = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, _, fn, args = heapq.heappop(self._heap)
+            fn(*args)
+            n += 1
+        return n
+
+
+class StationIndex:
+    """站點位置表：建一次，排序後的環上位置 + 總站旗標 + 容許誤差，查站用 bisect / searchsorted"""
+    def __init__(self, stations, hub_tol=0.02, stop_tol=0.015):
+        n = len(stations)
+        pos = np.array([s.get("progress", s["id"] / n) for s in stations])
+        self.station_pos = pos                       # stations 索引 -> 環上位置
+        self.order = np.argsort(pos)                 # 排序位置 -> stations 索引
+        self.pos = pos[self.order]
+        self.is_hub = np.array([s["is_hub"] for s in stations])
+        self.hub_order = self.order[self.is_hub[self.order]]
+        self.hub_pos = pos[self.hub_order]
+        self.hub_tol, self.stop_tol = hub_tol, stop_tol
+        self._pos_list = self.pos.tolist()
+        self._ring = self._wrap(self.pos, self.order)
+        self._hub_ring = self._wrap(self.hub_pos, self.hub_order)
+
+    @staticmethod
+    def _wrap(pos, order):
+        # 頭尾各補上繞一圈的鄰站，progress 0~1 的查詢不用再取模、算環上距離
+        if not pos.size:
+            return pos, order
+        return np.r_[pos[-1] - 1, pos, pos[0] + 1], np.r_[order[-1], order, order[0]]
+
+    @staticmethod
+    def _nearest(ring, p):
+        # 左右兩個候選站取距離較近者
+        pos, order = ring
+        hi = np.searchsorted(pos, p)
+        d_lo, d_hi = p - pos[hi - 1], pos[hi] - p
+        return order[hi - (d_lo <= d_hi)], np.minimum(d_lo, d_hi)
+
+    def nearest(self, p):
+        """每個位置最近的站 (stations 索引) 與環上距離 (progress 單位)"""
+        return self._nearest(self._ring, p)
+
+    def at_stop(self, p):
+        """整個車隊一次查：停在哪一站 (-1 表示不在站上)"""
+        sidx, d = self.nearest(p)
+        return np.where(d < self.stop_tol, sidx, -1)
+
+    def nearest_hub(self, p):
+        """最近的充電總站 (stations 索引) 與環上距離"""
+        return self._nearest(self._hub_ring, p)
+
+    def at_hub(self, p):
+        """是否在任一充電總站範圍內"""
+        if not self.hub_pos.size:
+            return np.zeros(np.shape(p), bool)
+        return self.nearest_hub(p)[1] < self.hub_tol
+
+    def stop_of(self, p):
+        """單一位置用 bisect 查站，回傳 stations 索引或 None"""
+        k = bisect.bisect_left(self._pos_list, p)
+        for j in (k - 1, k % len(self._pos_list)):
+            d = abs(p - self._pos_list[j])
+            if min(d, 1 - d) < self.stop_tol:
+                return int(self.order[j])
+        return None
+
+
+class Fleet:
+    def __init__(self, n, stations, streams=None):
+        self.streams = streams or RngStreams()
+        self.n = n
+        self.stations = stations
+        self.stops = StationIndex(stations)
+
+        init = self.streams.init
+        self.progress = init.random(n)
+        self.speed = np.zeros(n)
+        self.soc = init.uniform(45, 95, n)
+        self.state = np.full(n, MOVING, np.int8)
+        self.action = np.full(n, A_CRUISE, np.int8)
+        self.platooning = np.zeros(n, bool)
+        self.cd = np.full(n, 0.8)
+        self.passengers = np.zeros(n, np.int32)
+        self.target = np.full(n, -1, np.intp)   # 指派 / 正在使用的充電總站 (stations 索引)，-1 表示無
+
+        self.vehicles = [Vehicle(self, i) for i in range(n)]
+        self.ring = RingIndex(self.progress)
+        self.t = 0.0                  # 模擬時鐘 (秒)
+        self.boarded = 0
+        self.events = EventQueue()
+
+    def _release(self, idx):
+        """停靠結束：仍在 BOARDING 的車恢復行駛，已有充電指派的繼續前往總站 (期間被派去充電的不受影響)"""
+        idx = idx[self.state[idx] == BOARDING]
+        self.state[idx] = np.where(self.target[idx] >= 0, RETURN_HUB, MOVING)
+
+    def step(self, dt, wind, decision):
+        self.events.run_due(self.t)
+        self.boarded = 0   # 本 tick 上車人數 (給 Simulation 維護排隊總數)
+
+        # Layer 2: Platooning (每 tick 排序一次，鄰車由相鄰位置取得)
+        self.ring = RingIndex(self.progress)
+        min_dist = self.ring.nearest_gap()
+        self.platooning = (20 < min_dist) & (min_dist < 70)
+        self.cd = np.where(self.platooning, 0.4, 0.8)
+        self.action = np.where(self.platooning, A_PLATOON,
+                               np.where(self.state == CHARGING, A_CHARGE, A_CRUISE)).astype(np.int8)
+
+        # Layer 1 充電指令：單台 (charge_vehicle，任一總站) 或調度器的逐車指派 (dispatch: {車輛: 總站})
+        cv = decision.get("charge_vehicle")
+        if cv is not None and self.state[cv] != CHARGING:
+            self.state[cv] = RETURN_HUB
+        plan = decision.get("dispatch")
+        if plan:
+            ids = np.fromiter(plan, np.intp, len(plan))
+            ok = self.state[ids] != CHARGING
+            self.state[ids[ok]] = RETURN_HUB
+            self.target[ids[ok]] = np.fromiter(plan.values(), np.intp, len(plan))[ok]
+
+        # 到充電站：有指派的車只在指定總站停，未指派的停最近的總站
+        ret = np.flatnonzero(self.state == RETURN_HUB)
+        if ret.size and self.stops.hub_pos.size:
+            hub, d = self.stops.nearest_hub(self.progress[ret])
+            tgt = self.target[ret]
+            d_tgt = np.abs(self.progress[ret] - self.stops.station_pos[tgt])
+            arrived = np.where(tgt >= 0, np.minimum(d_tgt, 1 - d_tgt), d) < self.stops.hub_tol
+            arr = ret[arrived]
+            self.state[arr] = CHARGING
+            self.target[arr] = np.where(tgt[arrived] >= 0, tgt[arrived], hub[arrived])
+
+        charging = self.state == CHARGING
+        run = ~charging
+
+        target = np.where(self.soc < 25, 8.0, np.where(self.platooning, 16.0, 12.0))
+        self.speed = np.where(run, self.speed + (target - self.speed) * min(3 * dt, 1.0), 0.0)   # dt > 1/3 時直接到目標速度，大步長不會發散
+        self.progress = np.where(run, (self.progress + self.speed * dt / TRACK_M) % 1, self.progress)
+
+        power = 0.0008 * self.cd * (self.speed ** 3) * (1 + (wind - 12) * 0.04) * dt
+        self.soc = np.where(charging, np.minimum(100, self.soc + 30 * dt), self.soc - power)
+        done = (charging & (self.soc > 98)).nonzero()[0]
+        if done.size:
+            self.state[done] = MOVING
+            self.target[done] = -1
+
+        # 上下客：移動後的位置重新比對站點
+        sidx = self.stops.at_stop(self.progress)
+        cand = run & (sidx >= 0) & (self.streams.boarding.random(self.n) < 0.4)
+        alight = np.flatnonzero(cand & (self.passengers > 0))
+        board = np.flatnonzero(cand & (self.passengers == 0))
+        self._board(board, sidx[board])
+
+        if alight.size:
+            self.passengers[alight] = 0
+            self.state[alight] = BOARDING
+            self.events.schedule(self.t + 2, self._release, alight)
+        self.t += dt
+
+    def _board(self, idx, sidx):
+        """同站多台車依編號順序分配排隊人潮，每台最多 CAPACITY 人"""
+        if not idx.size:
+            return
+        waiting = np.array([s["waiting"] for s in self.stations])
+        order = np.argsort(sidx, kind="stable")
+        idx, sidx = idx[order], sidx[order]
+        k = np.arange(idx.size)
+        first = np.maximum.accumulate(np.where(np.concatenate(([True], sidx[1:] != sidx[:-1])), k, 0))
+        take = np.clip(waiting[sidx] - CAPACITY * (k - first), 0, CAPACITY)
+        ok = take > 0
+        idx, sidx, take = idx[ok], sidx[ok], take[ok]
+
+        self.passengers[idx] = take
+        self.state[idx] = BOARDING
+        self.boarded = int(take.sum())
+        np.subtract.at(waiting, sidx, take)
+        for s in np.unique(sidx):
+            self.stations[s]["waiting"] = int(waiting[s])
+        if idx.size:
+            self.events.schedule(self.t + 4, self._release, idx)
+
+    def columns(self):
+        """輸出用的欄位陣列 (已換算單位、四捨五入，與 to_dict 相同)"""
+        return {
+            "progress": self.progress,
+            "speed": np.round(self.speed * 3.6, 1),
+            "soc": np.round(self.soc, 1),
+            "state": self.state,
+            "action": self.action,
+            "platooning": self.platooning,
+            "cd": np.round(self.cd, 2),
+            "passengers": self.passengers,
+            "vel": np.round(self.speed / TRACK_M, 8),   # progress/秒，給客戶端外插位置
+        }
+
+    def to_dicts(self):
+        """整個車隊一次轉成 list[dict]，避免逐台取 numpy scalar"""
+        return rows(self.columns())
+
+
+LABELS = {"state": STATES, "action": ACTIONS}
+
+
+def wire(field, values):
+    """欄位陣列轉成可 JSON 化的 list (狀態碼轉回字串)"""
+    out = values.tolist()
+    labels = LABELS.get(field)
+    return [labels[c] for c in out] if labels else out
+
+
+def rows(cols):
+    """欄位陣列 -> 每台車一個 dict"""
+    keys = list(cols)
+    n = len(cols[keys[0]])
+    return [dict(zip(["id"] + keys, r)) for r in zip(range(n), *(wire(k, cols[k]) for k in keys))]
+
+
+class Vehicle:
+    """單台車的薄視圖，資料都在 Fleet 的陣列裡"""
+    def __init__(self, fleet, uid):
+        self.fleet = fleet
+        self.id = uid
+
+    progress = property(lambda self: float(self.fleet.progress[self.id]))
+    speed = property(lambda self: float(self.fleet.speed[self.id]))
+    soc = property(lambda self: float(self.fleet.soc[self.id]))
+    state = property(lambda self: STATES[self.fleet.state[self.id]])
+    action = property(lambda self: ACTIONS[self.fleet.action[self.id]])
+    platooning = property(lambda self: bool(self.fleet.platooning[self.id]))
+    cd = property(lambda self: float(self.fleet.cd[self.id]))
+    passengers = property(lambda self: int(self.fleet.passengers[self.id]))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "progress": self.progress,
+            "speed": round(self.speed*3.6, 1),
+            "soc": round(self.soc, 1),
+            "state": self.state,
+            "action": self.action,
+            "platooning": self.platooning,
+            "cd": round(self.cd, 2),
+            "passengers": self.passengers,
+            "vel": round(self.speed / TRACK_M, 8)
+        }
@@ -0,0 +1,81 @@
+# jsonbackend.py - 可替換的 JSON 編碼器 (orjson / ujson / 標準 json)，介面同 json 模組，NumPy 純量與陣列直接可編碼
+import json
+import numpy as np
+
+PREFERENCE = ("orjson", "ujson", "json")   # auto 時依序嘗試
+
+
+def _np_default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class StdlibJSON:
+    name = "json"
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault("separators", (",", ":"))
+        return json.dumps(obj, default=_np_default, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+
+class OrJSON:
+    """orjson 輸出 bytes，這裡轉回 str (Socket.IO 封包是文字)；separators 等參數忽略，輸出本來就是緊湊格式"""
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return self._orjson.dumps(obj, default=_np_default, option=self._option).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+
+class UJSON:
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, obj, **kwargs):
+        return self._ujson.dumps(obj, ensure_ascii=False, default=_np_default)
+
+    def loads(self, s, **kwargs):
+        return self._ujson.loads(s)
+
+
+BACKENDS = {"orjson": OrJSON, "ujson": UJSON, "json": StdlibJSON}
+
+
+def available():
+    """目前環境裡裝得起來的後端名稱"""
+    out = []
+    for name in PREFERENCE:
+        try:
+            BACKENDS[name]()
+        except ImportError:
+            continue
+        out.append(name)
+    return out
+
+
+def load(name="auto"):
+    """依名稱建立後端；auto 取第一個可用的，指定的套件沒裝就退回標準 json"""
+    if name != "auto" and name not in BACKENDS:
+        raise ValueError(f"unknown JSON backend {name!r} (choose from auto, {', '.join(BACKENDS)})")
+    for candidate in (PREFERENCE if name == "auto" else (name, "json")):
+        try:
+            return BACKENDS[candidate]()
+        except ImportError:
+            continue
+    return StdlibJSON()
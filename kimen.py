@@ -1,7 +1,7 @@
 import pygame
 import math
-import random
 import numpy as np
+from streams import RngStreams, seed_from_env
 
 # --- 1. 系統配置與視覺風格 (Cyberpunk Vibe) ---
 WIDTH, HEIGHT = 1400, 900
@@ -118,7 +118,7 @@ class RLAgent:
 # --- 4. 車輛實體 (The Physical Body) ---
 
 class Vehicle:
-    def __init__(self, id, track, start_idx):
+    def __init__(self, id, track, start_idx, soc=80.0):
         self.id = id
         self.track = track
         self.path_idx = start_idx
@@ -127,7 +127,7 @@ class Vehicle:
         # 物理狀態
         self.speed = 0
         self.target_speed = 5
-        self.soc = random.uniform(60, 100) # %
+        self.soc = soc # %
         self.cd = 0.8 # 風阻係數
         
         # 智慧體
@@ -361,6 +361,38 @@ def draw_map(screen):
         text = pygame.font.SysFont("Microsoft JhengHei", 14).render(name, True, (200, 200, 200))
         screen.blit(text, (s["pos"][0]+12, s["pos"][1]-10))
 
+def frame(screen, track, vehicles, selected_id, time_sec):
+    """一個畫面：環境變因 -> 車輛更新 -> 繪製 (不含 flip，benchmarks 可在 headless surface 上直接呼叫)"""
+    # 2. 環境變因更新
+    # 模擬陣風 (基礎 5m/s + 波動)
+    wind_speed = 5 + math.sin(time_sec * 0.5) * 5 
+    # 特定區域風更大
+    
+    # 3. 車輛更新
+    for v in vehicles:
+        # 檢查是否在強風區
+        local_wind = wind_speed
+        if 700 < v.pos[0] < 900 and 300 < v.pos[1] < 500:
+            local_wind += 10 # 太武山區加風
+        
+        v.update(vehicles, local_wind)
+
+    # 4. 繪製畫面
+    screen.fill(C_BG)
+    draw_map(screen)
+    
+    # 畫軌跡線
+    if len(track.points) > 1:
+        pygame.draw.lines(screen, C_ROAD, True, track.points, 5)
+        
+    # 畫車
+    for v in vehicles:
+        is_sel = (v.id == selected_id)
+        v.draw(screen, is_sel)
+        
+    # 畫儀表板
+    draw_ui(screen, vehicles, selected_id, wind_speed)
+
 def main():
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -369,11 +401,13 @@ def main():
     
     # 初始化系統
     track = Track()
+    streams = RngStreams(seed_from_env())  # SEED=1 python kimen.py 可重現同一場
+    socs = streams.init.uniform(60, 100, NUM_VEHICLES).tolist()
     vehicles = []
     for i in range(NUM_VEHICLES):
         # 分散初始位置
         start_idx = int((i / NUM_VEHICLES) * len(track.points))
-        vehicles.append(Vehicle(i, track, start_idx))
+        vehicles.append(Vehicle(i, track, start_idx, socs[i]))
         
     selected_id = 0 # 預設選中第一台
     
@@ -391,36 +425,8 @@ def main():
                     if dist < 30:
                         selected_id = v.id
 
-        # 2. 環境變因更新
-        time_sec = pygame.time.get_ticks() / 1000
-        # 模擬陣風 (基礎 5m/s + 波動)
-        wind_speed = 5 + math.sin(time_sec * 0.5) * 5 
-        # 特定區域風更大
-        
-        # 3. 車輛更新
-        for v in vehicles:
-            # 檢查是否在強風區
-            local_wind = wind_speed
-            if 700 < v.pos[0] < 900 and 300 < v.pos[1] < 500:
-                local_wind += 10 # 太武山區加風
-            
-            v.update(vehicles, local_wind)
-
-        # 4. 繪製畫面
-        screen.fill(C_BG)
-        draw_map(screen)
-        
-        # 畫軌跡線
-        if len(track.points) > 1:
-            pygame.draw.lines(screen, C_ROAD, True, track.points, 5)
-            
-        # 畫車
-        for v in vehicles:
-            is_sel = (v.id == selected_id)
-            v.draw(screen, is_sel)
-            
-        # 畫儀表板
-        draw_ui(screen, vehicles, selected_id, wind_speed)
+        # 2~4. 環境、車輛更新與繪製
+        frame(screen, track, vehicles, selected_id, pygame.time.get_ticks() / 1000)
         
         pygame.display.flip()
         clock.tick(FPS)
@@ -0,0 +1,89 @@
+# metrics.py - Prometheus 文字格式 (/metrics)：數值由 sim 執行緒與事件處理逐步更新，抓取時只做格式化
+import json
+from profiling import BUCKETS
+from payloads import RawJSON
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(names, values)) + "}"
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values = {} if labels else {(): 0.0}
+
+    def set(self, value, *labelvalues):
+        self.values[labelvalues] = value
+
+    def inc(self, value=1, *labelvalues):
+        self.values[labelvalues] = self.values.get(labelvalues, 0) + value
+
+    def dec(self, value=1, *labelvalues):
+        self.inc(-value, *labelvalues)
+
+    def samples(self):
+        for lv, v in self.values.items():
+            yield self.name + _labels(self.labels, lv), v
+
+
+class Counter(Gauge):
+    type = "counter"
+
+
+class Histogram:
+    """把 profiling.PhaseStats 的累計桶直接輸出成 Prometheus histogram，不另外記錄"""
+    type = "histogram"
+
+    def __init__(self, name, help, stats):
+        self.name, self.help, self.stats = name, help, stats
+
+    def samples(self):
+        cum = 0
+        for le, n in zip(BUCKETS + ("+Inf",), self.stats.buckets):
+            cum += n
+            yield f'{self.name}_bucket{{le="{le}"}}', cum
+        yield self.name + "_sum", self.stats.total
+        yield self.name + "_count", self.stats.count
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def exposition(self):
+        lines = []
+        for m in self.metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            lines.extend(f"{k} {v:g}" for k, v in m.samples())
+        return "\n".join(lines) + "\n"
+
+
+class CountingJSON:
+    """
+    給 SocketIO(json=...) 用的 json 模組替身：記下最近一次編碼的位元組數，用來統計推播流量。
+    Socket.IO 封包是 [事件, 參數...]，參數若是 payloads.RawJSON (已編碼) 就直接拼接。
+    """
+    def __init__(self, backend=json):
+        self.backend = backend
+        self.last_size = 0
+
+    def dumps(self, obj, **kwargs):
+        if isinstance(obj, list) and any(isinstance(o, RawJSON) for o in obj):
+            s = "[" + ",".join(o if isinstance(o, RawJSON) else self.backend.dumps(o, **kwargs) for o in obj) + "]"
+        else:
+            s = self.backend.dumps(obj, **kwargs)
+        self.last_size = len(s)
+        return s
+
+    def loads(self, s, **kwargs):
+        return self.backend.loads(s, **kwargs)
@@ -0,0 +1,35 @@
+# payloads.py - 每個 tick 的封包只編碼一次：推播、連線 / resync、REST 端點共用同一份 JSON 文字
+
+class RawJSON(str):
+    """已編碼好的 JSON 文字；CountingJSON.dumps 遇到它直接拼接，不再編碼"""
+    __slots__ = ()
+
+
+class PayloadCache:
+    """
+    以快照為單位的快取：get(snap, key, build) 在同一個快照內只呼叫一次 build() 並編碼。
+    保留最近 keep 個快照的表：推播 / 連線 keyframe 用的是最後一次廣播的快照 (encoder.last)，
+    /api/state 用的是最新的 sim.snapshot，兩者不同時不會互相把對方擠掉。
+    多執行緒同時 miss 只會重複編碼一次，結果相同，不需要鎖。
+    """
+    def __init__(self, dumps, keep=2):
+        self.dumps = dumps
+        self.keep = keep
+        self._tables = ()   # ((快照, {key: RawJSON}), ...)，新的在前，整個 tuple 一次換掉
+        self.hits = self.misses = 0
+
+    def get(self, snap, key, build):
+        tables = self._tables
+        for current, entries in tables:
+            if current is snap:
+                break
+        else:
+            entries = {}
+            self._tables = ((snap, entries),) + tables[:self.keep - 1]
+        text = entries.get(key)
+        if text is None:
+            self.misses += 1
+            text = entries[key] = RawJSON(self.dumps(build()))
+        else:
+            self.hits += 1
+        return text
@@ -0,0 +1,82 @@
+# profiling.py - 每個 tick 分階段計時：滾動視窗 p50/p95/p99 + 累計直方圖，開銷低到可以在正式環境常開
+import bisect, time
+import numpy as np
+
+PHASES = ("tick", "demand", "fleet_manager", "vehicle_update", "serialize", "emit")
+
+# 累計直方圖的桶上界 (秒)，Prometheus 也用同一組
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class PhaseStats:
+    """單一階段：最近 window 筆耗時的環形緩衝 (算百分位) + 自啟動以來的累計桶計數"""
+    def __init__(self, window=1024):
+        self.ring = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)   # 最後一格是 +Inf
+
+    def record(self, seconds):
+        self.ring[self.count % len(self.ring)] = seconds
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def summary(self):
+        recent = self.ring[:min(self.count, len(self.ring))]
+        if not recent.size:
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(recent, (50, 95, 99)) * 1000
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3),
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(p95, 3),
+            "p99_ms": round(p99, 3),
+            "max_ms": round(recent.max() * 1000, 3),
+        }
+
+
+class _Phase:
+    __slots__ = ("stats", "t0")
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.stats.record(time.perf_counter() - self.t0)
+
+
+class TickProfiler:
+    """用法：with prof.phase("emit"): ...  (同一階段不可巢狀，sim 執行緒單獨使用)"""
+    def __init__(self, phases=PHASES, window=1024):
+        self.stats = {p: PhaseStats(window) for p in phases}
+        self._phases = {p: _Phase(s) for p, s in self.stats.items()}
+
+    def phase(self, name):
+        return self._phases[name]
+
+    def summary(self):
+        return {p: s.summary() for p, s in self.stats.items()}
+
+
+class _NullPhase:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+class NullProfiler:
+    """headless / 掃描時不計時"""
+    _null = _NullPhase()
+
+    def phase(self, name):
+        return self._null
+
+    def summary(self):
+        return {}
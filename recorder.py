@@ -0,0 +1,108 @@
+# recorder.py - 逐 tick 紀錄車隊 / 站點狀態：每個 chunk 一個欄式 .npz 檔 (每欄一個 .npy)，背景執行緒寫入
+#
+# 目錄結構 (每次啟動一個 session 目錄)：
+#   <root>/<YYYYmmdd-HHMMSS>/meta.json          站點、欄位、chunk 大小、dt
+#   <root>/<YYYYmmdd-HHMMSS>/index.csv          每寫完一個 chunk 追加一列：chunk,file,seq0,seq1,t0,t1 (時間索引)
+#   <root>/<YYYYmmdd-HHMMSS>/chunk_000000.npz   seq, t, wind (ticks)、waiting (ticks × 站數)、各車輛欄位 (ticks × 車數)
+import json, os, queue, threading, time
+import numpy as np
+
+CHUNK_TICKS = 600              # 每個 chunk 最多幾個 tick (10 Hz 下一分鐘)
+CHUNK_BYTES = 16 * 2**20       # 大車隊時以大小為準，chunk 不超過約 16 MB
+MAX_PENDING_BYTES = 64 * 2**20 # 等待寫入的 chunk 總大小上限
+
+
+class Recorder:
+    """
+    sim 執行緒每 tick 把快照的各欄複製進預先配置的 chunk 緩衝 (ticks × n)，滿了整塊交給寫入執行緒，
+    寫完的緩衝回收重用。待寫入超過 max_pending_bytes 時整塊丟棄並計入 dropped，絕不讓模擬等磁碟；
+    常駐記憶體最多約 max_pending_bytes + 兩個 chunk (填寫中、寫入中)。
+    """
+    def __init__(self, root, stations, dt, chunk_ticks=CHUNK_TICKS, chunk_bytes=CHUNK_BYTES,
+                 max_pending_bytes=MAX_PENDING_BYTES):
+        self.dir = os.path.join(root, time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(self.dir, exist_ok=True)
+        self.max_ticks, self.chunk_bytes = chunk_ticks, chunk_bytes
+        self.max_pending_bytes = max_pending_bytes
+        self.meta = {"stations": stations, "dt": dt, "chunk_ticks": None, "fields": None, "started": time.time()}
+        self.chunk_ticks = None   # 第一個 tick 依每 tick 大小決定
+        self.tick_bytes = 0
+        self.chunks = 0           # 已寫入的 chunk 數
+        self.dropped = 0          # 佇列滿而丟棄的 tick 數
+        self._buf, self._row = None, 0
+        self._free = []           # 寫完可重用的緩衝
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name="recorder", daemon=True)
+        self._thread.start()
+
+    def _alloc(self, snap):
+        if self._free:
+            return self._free.pop()
+        n = self.chunk_ticks
+        buf = {k: np.empty((n,) + v.shape, v.dtype) for k, v in snap.cols.items()}
+        buf["waiting"] = np.empty((n,) + snap.waiting.shape, snap.waiting.dtype)
+        buf["seq"] = np.empty(n, np.int64)
+        buf["t"] = np.empty(n)
+        buf["wind"] = np.empty(n)
+        return buf
+
+    def record(self, snap):
+        """sim 執行緒每 tick 呼叫：只做幾次列複製"""
+        if self.chunk_ticks is None:
+            self.tick_bytes = sum(v.nbytes for v in snap.cols.values()) + snap.waiting.nbytes + 24
+            self.chunk_ticks = max(1, min(self.max_ticks, self.chunk_bytes // self.tick_bytes))
+            self.meta.update(chunk_ticks=self.chunk_ticks, fields=list(snap.cols), n_vehicles=snap.n)
+        if self._buf is None:
+            self._buf = self._alloc(snap)
+        buf, r = self._buf, self._row
+        for k, v in snap.cols.items():
+            buf[k][r] = v
+        buf["waiting"][r] = snap.waiting
+        buf["seq"][r], buf["t"][r], buf["wind"][r] = snap.seq, snap.t, snap.wind
+        self._row += 1
+        if self._row == self.chunk_ticks:
+            self.flush()
+
+    def flush(self):
+        if not self._row:
+            return
+        buf, rows = self._buf, self._row
+        self._row = 0
+        if (self._queue.qsize() + 1) * self.chunk_ticks * self.tick_bytes > self.max_pending_bytes:
+            self.dropped += rows     # 緩衝留著下一批直接覆寫
+            return
+        self._buf = None
+        self._queue.put((buf, rows))
+
+    def close(self):
+        """寫出未滿的最後一批並等寫入執行緒結束"""
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _writer(self):
+        index = os.path.join(self.dir, "index.csv")
+        with open(index, "a") as f:
+            f.write("chunk,file,seq0,seq1,t0,t1\n")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            buf, rows = item
+            self._write(buf, rows, index)
+            if len(self._free) < 2:
+                self._free.append(buf)
+
+    def _write(self, buf, rows, index):
+        if self.chunks == 0:
+            with open(os.path.join(self.dir, "meta.json"), "w") as f:
+                json.dump(self.meta, f, ensure_ascii=False)
+        name = f"chunk_{self.chunks:06d}.npz"
+        tmp = os.path.join(self.dir, name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **{k: v[:rows] for k, v in buf.items()})   # 不壓縮：讀取時可以只解開需要的欄位
+        os.replace(tmp, os.path.join(self.dir, name))
+        seq, t = buf["seq"], buf["t"]
+        with open(index, "a") as f:   # 檔案就位後才登記到索引，讀者看到的 chunk 一定完整
+            f.write(f"{self.chunks},{name},{seq[0]},{seq[rows - 1]},{float(t[0])!r},{float(t[rows - 1])!r}\n")
+        self.chunks += 1
@@ -0,0 +1,143 @@
+# replay.py - 重播 recorder.py 錄下的 session：依時間索引 O(1) 定位 chunk，只解開實際要播的 chunk，以 N 倍速產生 update 封包
+import csv, json, math, os, time
+import numpy as np
+from sim import Snapshot
+from telemetry import DeltaEncoder, keyframe
+
+MAX_SPEED = 100.0
+
+
+def parse_finite(x):
+    """客戶端傳來的倍速 / 時間：轉成 float，NaN、inf 或非數字丟 ValueError / TypeError"""
+    x = float(x)
+    if not math.isfinite(x):
+        raise ValueError(f"not a finite number: {x}")
+    return x
+
+
+def sessions(root):
+    """root 底下所有錄製 session 的摘要 (依名稱，也就是開始時間排序)"""
+    out = []
+    if not root or not os.path.isdir(root):
+        return out
+    for name in sorted(os.listdir(root)):
+        if os.path.exists(os.path.join(root, name, "meta.json")):
+            rec = Recording(os.path.join(root, name))
+            if len(rec):
+                out.append({"id": name, "t0": float(rec.t0[0]), "t1": float(rec.t1[-1]), "chunks": len(rec),
+                            "n_vehicles": rec.meta["n_vehicles"]})
+    return out
+
+
+def open_session(root, name):
+    """依 session 名稱開啟；名稱必須是 root 底下實際存在的目錄 (不接受路徑)"""
+    if not root or not os.path.isdir(root) or name not in os.listdir(root):
+        return None
+    path = os.path.join(root, name)
+    return Recording(path) if os.path.exists(os.path.join(path, "meta.json")) else None
+
+
+class Recording:
+    """一個 session 目錄：meta.json + index.csv 的時間索引；chunk 只在 load() 時才讀"""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.span = self.meta["chunk_ticks"] * self.meta["dt"]   # 一個 chunk 涵蓋的模擬秒數
+        self.refresh()
+
+    def refresh(self):
+        """重新讀時間索引 (錄製中的 session 會持續追加)"""
+        with open(os.path.join(self.path, "index.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.files = [r["file"] for r in rows]
+        self.t0 = np.array([float(r["t0"]) for r in rows])
+        self.t1 = np.array([float(r["t1"]) for r in rows])
+
+    def __len__(self):
+        return len(self.files)
+
+    def chunk_for(self, t):
+        """包含時間 t (或 t 之前最後一個 tick) 的 chunk：由 chunk 長度直接算出位置，
+        只有錄製時丟過批次才需要往回走幾格"""
+        k = min(max(int((t - self.t0[0]) // self.span), 0), len(self) - 1)
+        while k > 0 and t < self.t0[k]:
+            k -= 1
+        while k + 1 < len(self) and self.t0[k + 1] <= t:
+            k += 1
+        return k
+
+    def load(self, k):
+        """解開第 k 個 chunk 的所有欄位"""
+        with np.load(os.path.join(self.path, self.files[k])) as z:
+            return {name: z[name] for name in z.files}
+
+
+class ReplaySession:
+    """
+    一個客戶端的重播：播放頭依牆上時間 × speed 前進，每次 next_packet() 取播放頭所在的 tick，
+    用自己的 DeltaEncoder 編成與即時推播相同的 update 封包。手上只保留目前這一個 chunk。
+    """
+    def __init__(self, recording, speed=1.0, t=None, keyframe_every=50, clock=time.monotonic):
+        self.rec = recording
+        self.encoder = DeltaEncoder(keyframe_every)
+        self._clock = clock
+        self.speed = 1.0
+        self.set_speed(speed)
+        self.playhead = self.rec.t0[0] if t is None else parse_finite(t)
+        self._wall = None
+        self._k, self._chunk = None, None
+        self.chunks_loaded = 0
+        self.snapshot = None
+        self.stopped = False
+
+    def set_speed(self, speed):
+        self.speed = min(max(parse_finite(speed), 1.0), MAX_SPEED)
+
+    def seek(self, t):
+        self.playhead = parse_finite(t)
+        self.encoder = DeltaEncoder(self.encoder.keyframe_every)   # 跳轉後下一包是 keyframe
+
+    def _snapshot_at(self, t):
+        k = self.rec.chunk_for(t)
+        if k != self._k:
+            self._k, self._chunk = k, self.rec.load(k)
+            self.chunks_loaded += 1
+        c = self._chunk
+        j = max(int(np.searchsorted(c["t"], t, side="right")) - 1, 0)
+        cols = {f: c[f][j] for f in self.rec.meta["fields"]}
+        return Snapshot(int(c["seq"][j]), float(c["t"][j]), float(c["wind"][j]), cols, c["waiting"][j])
+
+    def next_packet(self):
+        """推進播放頭並回傳下一個 update 封包；播到錄製結尾回傳 None"""
+        now = self._clock()
+        if self._wall is not None:
+            self.playhead += (now - self._wall) * self.speed
+        self._wall = now
+        if self.playhead > self.rec.t1[-1]:
+            self.rec.refresh()   # 錄製中的 session 可能已經多了新的 chunk
+            if self.playhead > self.rec.t1[-1]:
+                return None
+        self.snapshot = self._snapshot_at(self.playhead)
+        return self.encoder.encode(self.snapshot)
+
+    def keyframe(self):
+        """客戶端要求重新同步時用"""
+        return keyframe(self.snapshot, self.encoder.seq) if self.snapshot else None
+
+    def run(self, emit, sleep, rate_hz=10):
+        """以 rate_hz 推送直到播完或 stop()；emit / sleep 由呼叫端提供 (協程模式要讓出控制權)"""
+        while not self.stopped:
+            packet = self.next_packet()
+            if packet is None:
+                emit("replay_end", {"t": float(self.rec.t1[-1])})
+                return
+            emit("update", packet)
+            sleep(1.0 / rate_hz)
+
+    def stop(self):
+        self.stopped = True
+
+    def status(self):
+        return {"t": round(float(self.playhead), 2), "speed": self.speed,
+                "t0": float(self.rec.t0[0]), "t1": float(self.rec.t1[-1])}
@@ -0,0 +1,149 @@
+# sim.py - 模擬核心 (不含 Flask)：站點、車隊、乘客需求、fleet_manager，即時伺服器與 headless 批次共用
+import copy, math
+import numpy as np
+from fleet import Fleet, RingIndex, rows
+from dispatch import Dispatcher
+from demand import make_demand
+from profiling import NullProfiler
+from streams import RngStreams
+
+# 站點座標完全對應你設計稿
+STATIONS = [
+    {"id":0, "name":"文化園區 (總站)", "x":950, "y":200, "is_hub":True, "waiting":0, "type":"hub", "chargers":2},
+    {"id":1, "name":"山后民俗村", "x":1150, "y":150, "is_hub":False, "waiting":0, "type":"spot"},
+    {"id":2, "name":"獅山砲陣地", "x":1250, "y":300, "is_hub":False, "waiting":0, "type":"spot"},
+    {"id":3, "name":"太武山", "x":800, "y":400, "is_hub":False, "waiting":0, "type":"spot"},
+    {"id":4, "name":"陳景蘭洋樓", "x":650, "y":600, "is_hub":False, "waiting":0, "type":"spot"},
+    {"id":5, "name":"翟山坑道", "x":250, "y":700, "is_hub":False, "waiting":0, "type":"spot"},
+    {"id":6, "name":"莒光樓 (市區)", "x":200, "y":450, "is_hub":True, "waiting":0, "type":"hub", "chargers":2},
+    {"id":7, "name":"古寧頭", "x":200, "y":200, "is_hub":False, "waiting":0, "type":"spot"},
+]
+
+# 風速剖面 (m/s)，以模擬時間為參數
+WIND_PROFILES = {
+    "gusty": lambda t: 10 + 9*math.sin(t/25),   # 預設陣風
+    "calm": lambda t: 6.0,
+    "strong": lambda t: 16 + 4*math.sin(t/25),
+}
+
+
+class Snapshot:
+    """
+    某個 tick 結束時的唯讀狀態 (陣列都設成不可寫)。sim 執行緒每個 tick 建一個新的，
+    再整個換掉 Simulation.snapshot 這個參考；讀者拿到的永遠是完整的一份，不需要鎖。
+    """
+    __slots__ = ("seq", "t", "wind", "cols", "waiting", "_ring")
+
+    def __init__(self, seq, t, wind, cols, waiting):
+        self.seq, self.t, self.wind = seq, t, wind
+        self.cols = cols          # Fleet.columns() 的複本 (輸出單位)
+        self.waiting = waiting    # 各站排隊人數
+        self._ring = None
+        for a in (*cols.values(), waiting):
+            a.flags.writeable = False
+
+    @classmethod
+    def capture(cls, sim, seq):
+        cols = {k: np.array(v) for k, v in sim.fleet.columns().items()}
+        waiting = np.array([s["waiting"] for s in sim.stations])
+        return cls(seq, sim.t, round(sim.wind, 1), cols, waiting)
+
+    @property
+    def n(self):
+        return len(self.cols["progress"])
+
+    @property
+    def ring(self):
+        """這個 tick 位置的環線索引，第一次用到才建 (重複建也只是同樣的結果)"""
+        if self._ring is None:
+            self._ring = RingIndex(self.cols["progress"])
+        return self._ring
+
+    def vehicles(self):
+        return rows(self.cols)
+
+    def vehicle(self, i):
+        return rows({k: v[i:i+1] for k, v in self.cols.items()})[0] | {"id": i}
+
+
+class Gust:
+    """隨機陣風擾動 (Ornstein-Uhlenbeck：標準差 sigma m/s、相關時間 tau 秒)，常態亂數一次抽一批"""
+    def __init__(self, rng, sigma, tau=20.0, batch=4096):
+        self.rng, self.sigma, self.tau, self.batch = rng, sigma, tau, batch
+        self.x = 0.0
+        self._z, self._k = (), 0
+
+    def __call__(self, dt):
+        if self._k == len(self._z):
+            self._z, self._k = self.rng.standard_normal(self.batch).tolist(), 0
+        z = self._z[self._k]
+        self._k += 1
+        a = math.exp(-dt / self.tau)
+        self.x = a * self.x + self.sigma * math.sqrt(1 - a * a) * z
+        return self.x
+
+
+class Simulation:
+    def __init__(self, n_vehicles=5, stations=None, seed=None, charge_soc=30, max_wait=25, wind="gusty",
+                 profiler=None, snapshots=False, dispatch_every=5.0, demand="flat", start_hour=0.0, gust=0.0,
+                 streams=None):
+        self.streams = streams or RngStreams(seed)   # init / demand / boarding / wind 各自獨立的亂數流
+        self.prof = profiler or NullProfiler()
+        self.charge_soc = charge_soc   # SoC 低於此值才列入充電候選
+        self.max_wait = max_wait       # 全線排隊人數低於此值才派車充電
+        self.wind_profile = WIND_PROFILES[wind]
+        self.gust = Gust(self.streams.wind, gust) if gust else None   # 疊加在剖面上的隨機陣風
+        self.stations = copy.deepcopy(stations or STATIONS)
+        self.fleet = Fleet(n_vehicles, self.stations, self.streams)
+        self.vehicles = self.fleet.vehicles
+        self.wind = 12.0
+        self.arrivals = 0   # 累計生成的乘客數
+        self.total_wait = sum(s["waiting"] for s in self.stations)  # 生成 / 上車時增減，不再每 tick 加總
+        self.demand = make_demand(demand, self.stations, self.streams.demand, start_hour)   # 時段剖面名稱 / CSV / 需求物件
+        # 充電調度器 (每 dispatch_every 秒批次指派)；None 則維持每 tick 只派一台最低電量的車
+        self.dispatcher = (Dispatcher(self.stations, self.fleet.stops, dispatch_every, max_wait)
+                           if dispatch_every else None)
+        self.steps = 0
+        self.snapshots = snapshots  # 即時伺服器才需要每 tick 發布唯讀快照，headless 不用
+        self.snapshot = Snapshot.capture(self, 0) if snapshots else None
+
+    @property
+    def t(self):
+        return self.fleet.t
+
+    def spawn_demand(self, dt):
+        k = self.demand.arrivals(self.t, dt)   # 各站到站人數
+        for i in np.flatnonzero(k).tolist():
+            self.stations[i]["waiting"] += int(k[i])
+        n = int(k.sum())
+        self.arrivals += n
+        self.total_wait += n
+
+    def low_soc(self):
+        """SoC 低於門檻的車輛編號"""
+        return np.flatnonzero(self.fleet.soc < self.charge_soc)
+
+    def fleet_manager(self):
+        # 排隊總數是累計值；低電量候選只在要用時算一次遮罩 (調度器每 dispatch_every 秒才用一次)
+        if self.dispatcher is not None:
+            if not self.dispatcher.due(self.t):
+                return {}
+            return {"dispatch": self.dispatcher.plan(self.fleet, self.low_soc(), self.total_wait)}
+        if self.total_wait >= self.max_wait or not self.fleet.n:
+            return {"charge_vehicle": None}
+        soc = np.where(self.fleet.soc < self.charge_soc, self.fleet.soc, np.inf)
+        i = int(soc.argmin())
+        return {"charge_vehicle": i if soc[i] < np.inf else None}
+
+    def step(self, dt):
+        self.wind = self.wind_profile(self.t) + (self.gust(dt) if self.gust else 0.0)
+        with self.prof.phase("demand"):
+            self.spawn_demand(dt)
+        with self.prof.phase("fleet_manager"):
+            decision = self.fleet_manager()
+        with self.prof.phase("vehicle_update"):
+            self.fleet.step(dt, self.wind, decision)
+        self.total_wait -= self.fleet.boarded
+        self.steps += 1
+        if self.snapshots:
+            self.snapshot = Snapshot.capture(self, self.steps)   # 單一參考指派，對讀者是原子的
@@ -1,4 +1,5 @@
-const socket = io();
+// 網址參數原樣帶給伺服器：?station=3 只收單站，?replay=<session>&speed=20&t=600 重播錄製的紀錄
+const socket = io({ query: Object.fromEntries(new URLSearchParams(location.search)) });
 const canvas = document.getElementById('mapCanvas');
 const ctx = canvas.getContext('2d');
 
@@ -19,24 +20,99 @@ socket.on('connect', () => {
     console.log(">> SYSTEM CONNECTED: UPLINK ESTABLISHED");
 });
 
-socket.on('config', (data) => {
-    config = data;
+// 靜態資料 (站點座標、景點圖文) 走可快取的 HTTP 端點，config 只帶版本號
+socket.on('config', async (data) => {
+    if (config && config.version === data.meta_version) return;
+    const meta = await (await fetch(data.meta_url)).json();
+    config = { version: data.meta_version, stations: meta.stations, frame: meta.frame, track_m: meta.track_m };
+    window.attractions = meta.attractions;
     resizeCanvas();
     console.log(">> CONFIG LOADED");
 });
 
+// update 事件：keyframe (data.key) 整包取代；差量封包只帶變動欄位
+let lastSeq = null;     // null = 尚未收到 keyframe
+let resyncing = false;
+
 socket.on('update', (data) => {
-    vehicles = data.vehicles;
-    document.getElementById('windSpeed').innerHTML = `${data.wind} <small>m/s</small>`;
-    window.attractions = data.attractions || {};  // 新增這行
-        // 新增：更新站點等待人數（可選）
-    if (data.stations) {
+    if (data.key) {
+        vehicles = stamp(data.vehicles);
         window.currentStations = data.stations;
+        resyncing = false;
+    } else {
+        // 漏包或還沒有 keyframe：要求伺服器補一個
+        if (lastSeq === null || data.seq !== lastSeq + 1) {
+            if (!resyncing) { resyncing = true; socket.emit('resync'); }
+            return;
+        }
+        applyPatch(vehicles, data.v);
+        applyPatch(window.currentStations, data.s);
     }
+    lastSeq = data.seq;
+    document.getElementById('windSpeed').innerHTML = `${data.wind} <small>m/s</small>`;
     updateSidebar();
     draw(); // 讓車子即時更新位置
 });
 
+// 二進位 frame (TELEMETRY_FORMAT=binary)：每 tick 整個車隊打包成固定長度紀錄
+socket.on('frame', (data) => {
+    if (!config) return;
+    vehicles = stamp(decodeFrame(data.data));
+    window.currentStations = data.waiting.map((w, id) => ({ id, waiting: w }));
+    document.getElementById('windSpeed').innerHTML = `${data.wind} <small>m/s</small>`;
+    updateSidebar();
+    draw();
+});
+
+// 紀錄格式見 telemetry.FRAME_DTYPE：u16 id, u16 progress, u8 soc, u8 speed, u8 state, u8 flags, u8 passengers
+function decodeFrame(buf) {
+    const view = new DataView(buf);
+    const { record_size: size, states, actions } = config.frame;
+    const out = [];
+    for (let off = 0; off + size <= view.byteLength; off += size) {
+        const flags = view.getUint8(off + 7);
+        out.push({
+            id: view.getUint16(off, true),
+            progress: view.getUint16(off + 2, true) / 65535,
+            soc: view.getUint8(off + 4),
+            speed: view.getUint8(off + 5),
+            state: states[view.getUint8(off + 6)],
+            platooning: (flags & 1) === 1,
+            action: actions[(flags >> 1) & 3],
+            cd: (flags & 1) ? 0.4 : 0.8,
+            passengers: view.getUint8(off + 8),
+        });
+    }
+    return out;
+}
+
+// 欄位導向差量：{欄位: {i: [索引...], x: [新值...]}}
+function applyPatch(rows, patch) {
+    if (!rows || !patch) return;
+    const now = performance.now();
+    for (const field in patch) {
+        const { i, x } = patch[field];
+        for (let k = 0; k < i.length; k++) {
+            rows[i[k]][field] = x[k];
+            if (field === 'progress') rows[i[k]]._t = now;
+        }
+    }
+}
+
+// 廣播頻率低於物理頻率：記下收到 progress 的時間，繪圖時用速度外插
+function stamp(rows) {
+    const now = performance.now();
+    rows.forEach(r => { r._t = now; });
+    return rows;
+}
+
+function displayProgress(v) {
+    // vel: progress/秒 (二進位 frame 沒帶，改由 km/h 換算)
+    const vel = v.vel ?? v.speed / 3.6 / config.track_m;
+    const dt = Math.min((performance.now() - v._t) / 1000, 1);  // 斷線時最多外插 1 秒
+    return (v.progress + vel * dt) % 1;
+}
+
 // --- Render Loop (60FPS) ---
 // 將繪圖與數據更新分離，保證動畫流暢
 function animate() {
@@ -96,7 +172,7 @@ function draw() {
 
     // 6. 繪製車輛
     vehicles.forEach(v => {
-        const pos = getPosFromProgress(v.progress);
+        const pos = getPosFromProgress(displayProgress(v));
         drawVehicle(pos.x, pos.y, pos.angle, v);
     });
 }
@@ -290,7 +366,7 @@ canvas.addEventListener('mousedown', (e) => {
     // 其次檢查車輛 (若未點到站點)
     if (!clicked) {
         vehicles.forEach(v => {
-            const pos = getPosFromProgress(v.progress);
+            const pos = getPosFromProgress(displayProgress(v));
             if (Math.hypot(pos.x - mx, pos.y - my) < 20) {
                 selectedId = `v-${v.id}`;
                 showVehicleInfo(v);
@@ -307,7 +383,7 @@ canvas.addEventListener('mousedown', (e) => {
 
 
 function showStationInfo(s) {
-    const attr = window.attractions[s.id] || {};
+    const attr = (window.attractions || {})[s.id] || {};
     const stationData = window.currentStations.find(st => st.id === s.id);
     
     document.getElementById('infoCard').classList.remove('hidden');
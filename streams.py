@@ -0,0 +1,33 @@
+# streams.py - 各子系統獨立的具名亂數流 (NumPy Generator)：同一個 seed 每次結果相同，改動一個子系統的抽樣不會影響其他子系統
+import os, secrets, zlib
+import numpy as np
+
+STREAMS = ("init", "demand", "boarding", "wind")
+
+
+class RngStreams:
+    """
+    streams.demand / streams["boarding"] 取得該子系統的 Generator (第一次用到才建立)。
+    每個流的種子由 (seed, 名稱) 決定，與建立順序無關；seed=None 時隨機產生並記在 self.seed，事後可用同一個值重現。
+    """
+    def __init__(self, seed=None):
+        self.seed = secrets.randbits(63) if seed is None else int(seed)   # 63 位元，JSON / CLI 都能直接帶
+        self._gens = {}
+
+    def __getitem__(self, name):
+        gen = self._gens.get(name)
+        if gen is None:
+            seq = np.random.SeedSequence(self.seed, spawn_key=(zlib.crc32(name.encode()),))
+            gen = self._gens[name] = np.random.default_rng(seq)
+        return gen
+
+    def __getattr__(self, name):
+        if name not in STREAMS:   # 屬性寫法只給已知的流，打錯字會直接報錯；其他名稱用 streams["..."]
+            raise AttributeError(name)
+        return self[name]
+
+
+def seed_from_env(var="SEED"):
+    """環境變數指定的 seed，未設定回傳 None"""
+    value = os.environ.get(var)
+    return int(value) if value else None
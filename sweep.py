@@ -0,0 +1,115 @@
+# sweep.py - 參數掃描：車隊規模 × fleet_manager 門檻 × 風速剖面 × 需求情境，用 ProcessPoolExecutor 吃滿所有核心跑 headless 模擬
+#   python sweep.py --vehicles 5 10 20 --charge-soc 20 30 --wind gusty calm --demand flat tourist --seeds 3 --out sweep.csv
+# 每個格點的結果依參數 + 模擬程式碼雜湊快取在 --cache 目錄，格點沒變就直接讀快取
+import argparse, csv, hashlib, itertools, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import headless
+from demand import PROFILES
+from sim import WIND_PROFILES
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CODE_FILES = ("fleet.py", "sim.py", "dispatch.py", "demand.py", "streams.py", "headless.py")  # 改到這些檔案，舊快取就失效
+
+
+def code_version():
+    h = hashlib.sha1()
+    for name in CODE_FILES:
+        with open(os.path.join(HERE, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+def grid(args):
+    for n, soc, wait, wind, every, demand, hour, gust, rep in itertools.product(
+            args.vehicles, args.charge_soc, args.max_wait, args.wind, args.dispatch_every,
+            args.demand, args.start_hour, args.gust, range(args.seeds)):
+        yield {"n_vehicles": n, "charge_soc": soc, "max_wait": wait, "wind": wind, "dispatch_every": every,
+               "demand": demand, "start_hour": hour, "gust": gust,
+               "hours": args.hours, "dt": args.dt, "seed": args.seed + rep}
+
+
+def cache_path(cache_dir, point, version):
+    if point["demand"].endswith(".csv"):   # 人數 CSV 的內容也算進快取鍵
+        with open(point["demand"], "rb") as f:
+            version = [version, hashlib.sha1(f.read()).hexdigest()[:12]]
+    key = hashlib.sha1(json.dumps([point, version], sort_keys=True).encode()).hexdigest()
+    return os.path.join(cache_dir, key + ".json")
+
+
+def run_point(point, path):
+    """worker：跑一個格點並寫入快取"""
+    result = {**point, **headless.run(**point)}
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp, path)   # 中斷時不會留下寫一半的快取
+    return result
+
+
+def write_table(rows, out):
+    if not rows:
+        return
+    if out.endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError:
+            sys.exit("parquet 輸出需要 pandas + pyarrow，或改用 .csv")
+        pd.DataFrame(rows).to_parquet(out, index=False)
+        return
+    with open(out, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]))
+        w.writeheader()
+        w.writerows(rows)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Eco-MaaS scenario sweep")
+    ap.add_argument("--vehicles", type=int, nargs="+", default=[5])
+    ap.add_argument("--charge-soc", type=float, nargs="+", default=[30])
+    ap.add_argument("--max-wait", type=int, nargs="+", default=[25])
+    ap.add_argument("--wind", nargs="+", choices=sorted(WIND_PROFILES), default=["gusty"])
+    ap.add_argument("--dispatch-every", type=float, nargs="+", default=[5.0], help="0 = 每 tick 只派一台")
+    ap.add_argument("--demand", nargs="+", default=["flat"], help=f"需求時段剖面 ({'/'.join(PROFILES)}) 或人數 CSV 路徑")
+    ap.add_argument("--start-hour", type=float, nargs="+", default=[0.0], help="模擬開始的時刻")
+    ap.add_argument("--gust", type=float, nargs="+", default=[0.0], help="隨機陣風標準差 (m/s)")
+    ap.add_argument("--hours", type=float, default=24.0)
+    ap.add_argument("--dt", type=headless.step_seconds, default=0.1, help="物理步長 (秒)，見 headless.py")
+    ap.add_argument("--seeds", type=int, default=1, help="每個格點跑幾個不同 seed")
+    ap.add_argument("--seed", type=int, default=0, help="起始 seed")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--cache", default=".sweep_cache")
+    ap.add_argument("--out", default="sweep.csv")
+    args = ap.parse_args(argv)
+    if args.seeds < 1:
+        ap.error("--seeds 至少要 1")
+    bad = [d for d in args.demand if d not in PROFILES and not (d.endswith(".csv") and os.path.exists(d))]
+    if bad:
+        ap.error(f"--demand: 不是時段剖面也不是存在的 CSV: {bad}")
+
+    os.makedirs(args.cache, exist_ok=True)
+    version = code_version()
+    rows, todo = [], []
+    for point in grid(args):
+        path = cache_path(args.cache, point, version)
+        if os.path.exists(path):
+            with open(path) as f:
+                rows.append(json.load(f))
+        else:
+            todo.append((point, path))
+    print(f">> {len(rows)} cached, {len(todo)} to run on {args.workers} workers", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        futures = [pool.submit(run_point, p, path) for p, path in todo]
+        for i, fut in enumerate(as_completed(futures), 1):
+            rows.append(fut.result())
+            print(f">> {i}/{len(todo)} done ({time.perf_counter() - t0:.0f} s)", file=sys.stderr)
+
+    keys = ("n_vehicles", "charge_soc", "max_wait", "wind", "dispatch_every", "demand", "start_hour", "gust", "seed")
+    rows.sort(key=lambda r: tuple(r[k] for k in keys))
+    write_table(rows, args.out)
+    print(f">> wrote {len(rows)} rows to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# telemetry.py - 推播封包編碼：keyframe + 差量 (delta) 更新、二進位 frame，降低 kiosk 頻寬與 JSON 編碼負擔
+import numpy as np
+from fleet import wire, STATES, CAPACITY, TRACK_M
+
+# 連續欄位的 dead-band：與上次送出的值相差超過才送；其他欄位有變就送
+DEADBAND = {"progress": 0.0002, "speed": 0.5, "soc": 0.5, "vel": 2e-6}
+
+
+class DeltaEncoder:
+    """
+    每 keyframe_every 個 tick 送一次完整 keyframe，中間只送變動欄位。
+    比對基準是「客戶端目前看到的值」(上次送出的值)，所以 dead-band 內的小變動不會累積漂移。
+    差量格式 (欄位導向)：{"seq": n, "v": {欄位: {"i": [車號...], "x": [值...]}}, "s": {"waiting": {...}}, "wind": w}
+    只由 sim 執行緒呼叫；其他執行緒要 keyframe 請用 last 的 (seq, 快照) 建，之後的差量才接得上
+    """
+    def __init__(self, keyframe_every=50, deadband=None):
+        self.keyframe_every = keyframe_every
+        self.deadband = {**DEADBAND, **(deadband or {})}
+        self.seq = 0
+        self._ref = None
+        self._waiting = None
+        self.last = None   # (seq, 最後一次編碼的快照)，一次指定，其他執行緒讀到的一定成對
+
+    def _diff(self, ref, cols):
+        patch = {}
+        for k, col in cols.items():
+            band = self.deadband.get(k)
+            changed = np.abs(col - ref[k]) > band if band else col != ref[k]
+            idx = np.flatnonzero(changed)
+            if idx.size:
+                ref[k][idx] = col[idx]
+                patch[k] = {"i": idx.tolist(), "x": wire(k, col[idx])}
+        return patch
+
+    def encode(self, snap):
+        """snap 為 sim.Snapshot，回傳這個 tick 要廣播的封包"""
+        self.seq += 1
+        if self._ref is None or self.seq % self.keyframe_every == 0 or len(snap.waiting) != len(self._waiting):
+            self._ref = {k: v.copy() for k, v in snap.cols.items()}
+            self._waiting = snap.waiting.copy()
+            packet = keyframe(snap, self.seq)
+        else:
+            packet = {
+                "seq": self.seq,
+                "v": self._diff(self._ref, snap.cols),
+                "s": self._diff({"waiting": self._waiting}, {"waiting": snap.waiting}),
+                "wind": snap.wind,
+            }
+        self.last = (self.seq, snap)
+        return packet
+
+
+def keyframe(snap, seq):
+    """完整 keyframe (定期送出，或給剛連線、要求重新同步的客戶端)"""
+    return {
+        "key": True,
+        "seq": seq,
+        "vehicles": snap.vehicles(),
+        "stations": [{"id": i, "waiting": w} for i, w in enumerate(snap.waiting.tolist())],
+        "wind": snap.wind,
+    }
+
+
+# 二進位 frame：每台車一筆固定長度紀錄 (little-endian、無 padding)，瀏覽器用 DataView 解
+# flags: bit0 = platooning，bit1-2 = action 編碼；cd 由 platooning 決定所以不送
+FRAME_DTYPE = np.dtype([
+    ("id", "<u2"),
+    ("progress", "<u2"),   # progress * 65535
+    ("soc", "u1"),         # %
+    ("speed", "u1"),       # km/h
+    ("state", "u1"),
+    ("flags", "u1"),
+    ("passengers", "u1"),
+])
+
+
+def pack_frame(cols):
+    """Fleet.columns() -> bytes，長度 = 車數 * FRAME_DTYPE.itemsize"""
+    n = len(cols["progress"])
+    rec = np.empty(n, FRAME_DTYPE)
+    rec["id"] = np.arange(n)
+    rec["progress"] = np.round(cols["progress"] * 65535)
+    rec["soc"] = np.clip(np.round(cols["soc"]), 0, 255)
+    rec["speed"] = np.clip(np.round(cols["speed"]), 0, 255)
+    rec["state"] = cols["state"]
+    rec["flags"] = cols["platooning"] | (cols["action"].astype(np.uint8) << 1)
+    rec["passengers"] = np.minimum(cols["passengers"], 255)
+    return rec.tobytes()
+
+
+# 房間訂閱用的精簡封包：每個有人訂閱的房間每次廣播只算一次
+def station_view(snap, station_id, station_pos, k=3):
+    """站牌顯示器：排隊人數 + 即將到站的 k 台車 (ETA、載客)"""
+    ids, dist = snap.ring.approaching(station_pos, k)
+    cols = snap.cols
+    speed = np.maximum(cols["vel"][ids] * TRACK_M, 0.5)   # m/s，停靠/充電中的車以慢速估算
+    return {
+        "station": station_id,
+        "waiting": int(snap.waiting[station_id]),
+        "approaching": [
+            {"id": i, "eta_s": round(eta), "dist_m": round(d), "passengers": p, "capacity": CAPACITY, "state": STATES[s]}
+            for i, eta, d, p, s in zip(ids.tolist(), (dist / speed).tolist(), dist.tolist(),
+                                       cols["passengers"][ids].tolist(), cols["state"][ids].tolist())
+        ],
+    }
+
+
+def vehicle_view(snap, i):
+    """單車詳細：完整狀態 + 正前方車輛與間距"""
+    ring = snap.ring
+    ahead = ring.ahead(i)
+    return {
+        "vehicle": snap.vehicle(i),
+        "ahead": {"id": ahead, "gap_m": round(float(ring.gap_ahead[i]), 1)} if ahead != i else None,
+    }
@@ -0,0 +1,4 @@
+# conftest.py - 模組都在 repo 根目錄 (沒有套件安裝)，讓直接執行 pytest 也找得到
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
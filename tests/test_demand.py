@@ -0,0 +1,34 @@
+# test_demand.py - ReplayDemand 以一天為週期重播：CSV 不從 00:00 開始也不能多算或錯開時段
+import numpy as np
+from demand import ReplayDemand
+from sim import STATIONS
+
+CSV = "time,1,3\n08:00,20,5\n12:00,10,2\n18:00,0,0\n"
+
+
+def replay(tmp_path, **kwargs):
+    path = tmp_path / "counts.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return ReplayDemand(str(path), STATIONS, **kwargs)
+
+
+def test_daily_totals_match_csv(tmp_path):
+    r = replay(tmp_path)
+    assert r.day(1.0, 24).sum(0)[[1, 3]].tolist() == [30, 7]
+    assert r.day(1.0, 48).sum(0)[[1, 3]].tolist() == [60, 14]
+
+
+def test_time_of_day_does_not_drift(tmp_path):
+    r = replay(tmp_path)
+    per_min = r.day(60.0, 48)[:, 1]
+    active = np.flatnonzero(per_min)
+    # 只在 08:00~18:00 之間有人到站，第二天同一時段
+    day1, day2 = active[active < 1440], active[active >= 1440] - 1440
+    assert day1.min() >= 8 * 60 and day1.max() < 18 * 60
+    assert day1.tolist() == day2.tolist()
+
+
+def test_start_hour_keeps_daily_total(tmp_path):
+    r = replay(tmp_path, start_hour=10)
+    assert r.day(1.0, 24).sum(0)[[1, 3]].tolist() == [30, 7]
+    assert sum(r.arrivals(t, 1.0)[1] for t in range(3600)) == 5   # 10:00~11:00：20 人攤在 4 小時
@@ -0,0 +1,25 @@
+# test_dispatch.py - 途中停靠上下客 (BOARDING) 的車仍保留原本的總站指派，不能再被派一次
+import numpy as np
+from fleet import BOARDING
+from sim import Simulation
+
+
+def test_boarding_vehicle_with_reservation_is_not_redispatched():
+    sim = Simulation(10, seed=0)
+    f, d = sim.fleet, sim.dispatcher
+    f.soc[:] = 20.0
+    hub = int(d.hubs[0])
+    f.state[0], f.target[0] = BOARDING, hub
+    plan = d.plan(f, sim.low_soc(), 0)
+    assert 0 not in plan
+    # 它的預約仍佔著一個充電樁
+    assert sum(h == hub for h in plan.values()) <= d.chargers[0] - 1
+
+
+def test_reserved_boarding_vehicle_counts_as_out_of_service():
+    sim = Simulation(4, seed=0)
+    f, d = sim.fleet, sim.dispatcher
+    f.soc[:] = 20.0
+    f.state[:2], f.target[:2] = BOARDING, int(d.hubs[0])
+    # 4 台中 2 台已預約充電：排隊 12 人需要 1 台在線，最多只能再派 1 台
+    assert len(d.plan(f, np.arange(2, 4), 12)) <= 1
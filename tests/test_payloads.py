@@ -0,0 +1,24 @@
+# test_payloads.py - 連線 keyframe (最後廣播的快照) 與 /api/state (最新快照) 交替取用時都要命中快取
+import json
+from payloads import PayloadCache
+
+
+class Snap:
+    pass
+
+
+def test_two_live_snapshots_do_not_evict_each_other():
+    cache = PayloadCache(json.dumps)
+    broadcast, latest = Snap(), Snap()
+    for _ in range(25):
+        cache.get(broadcast, "keyframe", lambda: {"k": 1})
+        cache.get(latest, "state", lambda: {"s": 2})
+    assert (cache.misses, cache.hits) == (2, 48)
+
+
+def test_oldest_snapshot_is_dropped():
+    cache = PayloadCache(json.dumps, keep=2)
+    a, b, c = Snap(), Snap(), Snap()
+    for s in (a, b, c, a):
+        cache.get(s, "x", lambda: [])
+    assert cache.misses == 4
@@ -0,0 +1,52 @@
+# test_recorder.py - 錄製的 chunk 緩衝：重播讀回來逐 tick 一致、chunk 與待寫入量以位元組為上限
+import numpy as np
+import pytest
+import replay
+from recorder import Recorder
+from sim import Simulation
+
+
+def record(root, ticks, **kwargs):
+    sim = Simulation(50, seed=0, snapshots=True)
+    rec = Recorder(str(root), sim.stations, 0.1, **kwargs)
+    seen = {}
+    for _ in range(ticks):
+        sim.step(0.1)
+        rec.record(sim.snapshot)
+        seen[sim.snapshot.seq] = (sim.snapshot.t, sim.snapshot.cols["soc"].copy())
+    rec.close()
+    return rec, seen
+
+
+def test_round_trip_through_replay(tmp_path):
+    rec, seen = record(tmp_path, 250, chunk_ticks=100)
+    assert (rec.chunk_ticks, rec.chunks, rec.dropped) == (100, 3, 0)
+    session = replay.ReplaySession(replay.Recording(rec.dir))
+    for seq, (t, soc) in seen.items():
+        snap = session._snapshot_at(t)
+        assert snap.seq == seq and np.array_equal(snap.cols["soc"], soc)
+
+
+def test_chunk_size_capped_in_bytes(tmp_path):
+    rec, _ = record(tmp_path, 10, chunk_bytes=4096)
+    assert rec.chunk_ticks * rec.tick_bytes <= 4096
+
+
+def test_drops_whole_chunks_when_pending_bytes_exceeded(tmp_path):
+    rec, _ = record(tmp_path, 100, chunk_ticks=10, max_pending_bytes=0)
+    assert rec.chunks == 0 and rec.dropped == 100
+
+
+def test_open_session_with_missing_root(tmp_path):
+    assert replay.open_session(str(tmp_path / "nope"), "x") is None
+
+
+def test_replay_rejects_non_finite_controls(tmp_path):
+    rec, _ = record(tmp_path, 20)
+    session = replay.ReplaySession(replay.Recording(rec.dir))
+    for bad in ("nan", "inf", "fast", None):
+        with pytest.raises((TypeError, ValueError)):
+            session.set_speed(bad)
+        with pytest.raises((TypeError, ValueError)):
+            session.seek(bad)
+    assert session.speed == 1.0
@@ -0,0 +1,26 @@
+# test_telemetry.py - 晚加入的客戶端：以 encoder.last 建的 keyframe 接上之後的差量，沒有 dead-band 的欄位必須一致
+from sim import Simulation, Snapshot
+from telemetry import DeltaEncoder, keyframe
+
+
+def with_passengers(snap, seq, value):
+    cols = {k: v.copy() for k, v in snap.cols.items()}
+    cols["passengers"][0] = value
+    return Snapshot(seq, snap.t, snap.wind, cols, snap.waiting.copy())
+
+
+def test_late_joiner_keyframe_matches_delta_reference():
+    sim = Simulation(5, seed=0, snapshots=True)
+    sim.step(0.1)
+    a = with_passengers(sim.snapshot, 1, 0)
+    b = with_passengers(sim.snapshot, 2, 3)   # sim 已經往前走，還沒推播
+    enc = DeltaEncoder(keyframe_every=10**9)
+    enc.encode(a)
+    assert enc.last == (1, a)
+
+    seq, snap = enc.last                       # 在 b 之後才連線的客戶端
+    view = keyframe(snap, seq)["vehicles"]
+    delta = enc.encode(with_passengers(b, 3, 0))   # 乘客又下車：和比對基準相同，不會送出
+    assert "passengers" not in delta["v"]
+    assert view[0]["passengers"] == 0
+    assert keyframe(b, seq)["vehicles"][0]["passengers"] == 3   # 舊做法：客戶端會一直停在 3